@@ -0,0 +1,195 @@
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# =========================
+# KONFIGURASI
+# =========================
+NAMA_MODEL = os.environ.get("CARING_AI_MODEL", "gemini-1.5-flash")
+TIMEOUT_DETIK = float(os.environ.get("CARING_AI_TIMEOUT", "60"))
+MAKS_PERCOBAAN = int(os.environ.get("CARING_AI_RETRY", "3"))
+CACHE_TTL_DETIK = float(os.environ.get("CARING_AI_CACHE_TTL", "3600"))
+CACHE_MAKS = int(os.environ.get("CARING_AI_CACHE_MAKS", "128"))
+
+TEMPLATE_PROMPT = """
+Kamu adalah AI analis Collection. Berdasarkan ringkasan berikut, buat SOLUSI OTOMATIS dengan fokus hanya pada 4 status utama: UNCONTACTABLE, ISSUED, NOT YET, JANJI BAYAR.
+
+Format jawaban:
+1) Prioritas Tindakan (bullet per DATEL, hanya untuk 4 status ini)
+2) Quick Wins 7 Hari (Hari 1–7, aksi harian spesifik)
+3) Solusi untuk Uncontactable (alternatif multi-channel, data sekunder, kunjungan lapangan) fokuskan
+4) baca kolom ADDITIONAL INFO dari file yang di upload, khususnya pada jenis caring SALAH SAMBUNG dan COMPLAINT LAYANAN. Berikan solusi terbaik dari kolom tersebut
+
+
+Syarat:
+- Sebutkan DATEL paling berisiko berdasarkan data Caring 2.
+- Untuk setiap DATEL, jelaskan tindakan sesuai status dominan (Uncontactable, Issued, Not Yet, Janji Bayar).
+- Quick wins harus kuantitatif (contoh: Uncontactable ↓20% dalam 7 hari, 50% Janji Bayar terealisasi).
+- Solusi harus singkat, to the point, actionable.
+Ringkasan data:
+
+{summary}
+
+"""
+
+
+def mode_stub():
+    # CARING_AI_STUB=1 -> pakai model lokal palsu, tanpa jaringan & tanpa API key
+    return os.environ.get("CARING_AI_STUB", "").lower() in ("1", "true", "ya", "yes")
+
+
+def buat_prompt(summary):
+    return TEMPLATE_PROMPT.format(summary=summary)
+
+
+# =========================
+# CACHE JAWABAN (TTL + LRU)
+# =========================
+class CacheJawaban:
+    def __init__(self, maks=CACHE_MAKS, ttl=CACHE_TTL_DETIK):
+        self.maks = maks
+        self.ttl = ttl
+        self._data = OrderedDict()   # kunci -> (waktu_simpan, teks)
+        self._lock = threading.Lock()
+
+    def ambil(self, kunci):
+        with self._lock:
+            item = self._data.get(kunci)
+            if item is None:
+                return None
+            if time.monotonic() - item[0] > self.ttl:
+                del self._data[kunci]
+                return None
+            self._data.move_to_end(kunci)
+            return item[1]
+
+    def simpan(self, kunci, teks):
+        with self._lock:
+            self._data[kunci] = (time.monotonic(), teks)
+            self._data.move_to_end(kunci)
+            while len(self._data) > self.maks:
+                self._data.popitem(last=False)
+
+
+_cache_jawaban = CacheJawaban()
+
+
+def kunci_cache(nama_model, summary):
+    isi = "\x00".join([nama_model, TEMPLATE_PROMPT, summary])
+    return hashlib.sha256(isi.encode("utf-8")).hexdigest()
+
+
+# =========================
+# MODEL STUB (OFFLINE)
+# =========================
+class _Potongan:
+    def __init__(self, text):
+        self.text = text
+
+
+class ModelStub:
+    # Meniru GenerativeModel.generate_content untuk uji offline: jawaban deterministik
+    # dari ringkasan di prompt, dikirim per kata kalau stream=True
+    def __init__(self, jeda_detik=0.0):
+        self.jeda_detik = jeda_detik
+        self.jumlah_panggilan = 0
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.jumlah_panggilan += 1
+        ringkasan = prompt.split("Ringkasan data:", 1)[-1].strip()
+        teks = "**[STUB] Analisis offline**\n\n" + "\n".join(
+            f"- {baris.strip()}" for baris in ringkasan.splitlines() if baris.strip()
+        )
+        if not stream:
+            return _Potongan(teks)
+        return self._stream(teks)
+
+    def _stream(self, teks):
+        for kata in teks.split(" "):
+            if self.jeda_detik:
+                time.sleep(self.jeda_detik)
+            yield _Potongan(kata + " ")
+
+
+# =========================
+# KLIEN AI
+# =========================
+class KlienAI:
+    def __init__(self, api_key=None, nama_model=NAMA_MODEL, model=None,
+                 timeout=TIMEOUT_DETIK, maks_percobaan=MAKS_PERCOBAAN, cache=None):
+        self.api_key = api_key
+        self.nama_model = nama_model
+        self.timeout = timeout
+        self.maks_percobaan = max(1, maks_percobaan)
+        self.cache = cache or _cache_jawaban
+        self._model = model
+
+    def model(self):
+        if self._model is None:
+            if mode_stub():
+                self._model = ModelStub()
+            else:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.nama_model)
+        return self._model
+
+    def _mulai_stream(self, prompt):
+        # Retry hanya sampai potongan pertama diterima, supaya teks tidak dobel di layar
+        error_terakhir = None
+        for percobaan in range(self.maks_percobaan):
+            try:
+                resp = self.model().generate_content(
+                    prompt, stream=True, request_options={"timeout": self.timeout}
+                )
+                potongan_iter = iter(resp)
+                pertama = next(potongan_iter, None)
+                if pertama is None:
+                    return iter(())
+                return itertools.chain([pertama], potongan_iter)
+            except Exception as e:
+                error_terakhir = e
+                if percobaan + 1 < self.maks_percobaan:
+                    time.sleep(min(2 ** percobaan, 8))
+        raise error_terakhir
+
+    def analisis_stream(self, summary):
+        kunci = kunci_cache(self.nama_model, summary)
+        teks = self.cache.ambil(kunci)
+        if teks is not None:
+            yield teks
+            return
+
+        bagian = []
+        for potongan in self._mulai_stream(buat_prompt(summary)):
+            try:
+                teks = potongan.text
+            except ValueError:
+                # Potongan tanpa teks (mis. diblokir safety filter)
+                continue
+            bagian.append(teks)
+            yield teks
+        # Jawaban kosong (semua potongan diblokir / stream tanpa potongan) tidak di-cache,
+        # supaya klik berikutnya memanggil model lagi, bukan mengulang teks kosong selama TTL
+        hasil = "".join(bagian)
+        if hasil.strip():
+            self.cache.simpan(kunci, hasil)
+
+    def analisis(self, summary):
+        return "".join(self.analisis_stream(summary))
+
+
+_klien = {}
+_klien_lock = threading.Lock()
+
+
+def klien_untuk(api_key):
+    # Satu klien per API key: genai.configure cukup sekali, bukan di setiap rerun
+    with _klien_lock:
+        if api_key not in _klien:
+            _klien[api_key] = KlienAI(api_key)
+        return _klien[api_key]
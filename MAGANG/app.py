@@ -1,16 +1,53 @@
+import os
+from contextlib import contextmanager
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import google.generativeai as genai
-from rapidfuzz import process
 
-gemini_api_key = st.secrets["GEMINI_API_KEY"]  # ambil dari Streamlit Secrets
+from ai_client import klien_untuk, mode_stub
+from profiling import Profiler, aktif_dari_env
+
+# pandas, plotly, rapidfuzz & google.generativeai baru di-import saat benar-benar dipakai,
+# supaya halaman awal (sebelum upload) langsung tampil di sesi/container baru
+
+
+def baca_api_key():
+    # Ambil dari Streamlit Secrets (fallback env GEMINI_API_KEY); tidak ada key -> None, bukan exception
+    try:
+        return st.secrets["GEMINI_API_KEY"]
+    except Exception:
+        return os.environ.get("GEMINI_API_KEY")
+
+
+def memo_bagian(nama, kunci, hitung):
+    # Hasil terakhir tiap section disimpan per sesi bersama kunci dependensinya,
+    # dihitung ulang hanya kalau salah satu dependensi berubah
+    simpanan = st.session_state.get(f"_memo_{nama}")
+    if simpanan is None or simpanan[0] != kunci:
+        simpanan = (kunci, hitung())
+        st.session_state[f"_memo_{nama}"] = simpanan
+    return simpanan[1]
 
-genai.configure(api_key=gemini_api_key)
+
+@contextmanager
+def profil_fragment(nama, tampilkan=True):
+    # Rerun fragment saja tidak membuat Profiler baru di atas skrip: tahapnya dicatat sebagai rerun
+    # tersendiri (id & baris TOTAL sendiri), ringkasannya tampil di fragment karena panel debug tidak ikut rerun
+    p = profil.untuk_fragment(nama)
+    try:
+        yield p
+    finally:
+        if p is not profil:
+            p.selesai()
+            if tampilkan and p.aktif and p.catatan:
+                tahap = ", ".join(f"{c['tahap']} {c['detik']:.3f}s" for c in p.catatan)
+                st.caption(f"🐞 Rerun fragment {p.rerun}: {tahap}")
 
 
 st.set_page_config(page_title="Dashboard Caring", layout="wide")
 
+# Profiling per tahap (panel debug di sidebar / CARING_PROFIL=1); saat mati tahap() tidak mengukur apa pun
+profil = Profiler(st.session_state.get("panel_profil", aktif_dari_env()))
+
 # =========================
 # AREA UTAMA - TITLE & UPLOAD
 # =========================
@@ -18,9 +55,25 @@ st.title("📊 Visualisasi Data Caring C3MR - SUMBAR & JAMBI")
 uploaded_file = st.file_uploader("Upload file Excel", type=["xlsx"])
 
 if uploaded_file:
+    import pandas as pd
+
+    from core import (daftar_chart, digest_untuk, klausa_caring, kolom_caring_aktif, kolom_kosong,
+                      pilihan_hasil_caring, sheet_valid)
+    from ekspor import FORMAT_EKSPOR, ekspor_ke_file_sementara, nama_file_ekspor
+    from filter_index import indeks_untuk
+    from ingest import hash_konten, muat_semua_sheet, muat_sheet
+    from kubus import bandingkan_sheet, hitung_ringkasan, kolom_caring, kubus_untuk
+    from render import bar_kosong, pie, px_figure, tabel_halaman
+    from riwayat import (daftar_periode, riwayat_aktif, simpan_sheet, status_periode, tren_kategori,
+                         tren_paid_rate)
+
     # Ambil hanya sheet yang diawali 'SUMBAR JAMBI'
-    excel_file = pd.ExcelFile(uploaded_file)
-    valid_sheets = [s for s in excel_file.sheet_names if s.upper().startswith("SUMBAR JAMBI")]
+    # Isi file di-hash sekali, parse + pembersihan sheet di-cache per (hash, sheet)
+    file_bytes = uploaded_file.getvalue()
+    with profil.tahap("hash_file"):
+        file_hash = hash_konten(file_bytes)
+    with profil.tahap("daftar_sheet"):
+        valid_sheets = sheet_valid(file_bytes, file_hash)
 
     if not valid_sheets:
         st.error("Tidak ada sheet yang diawali 'SUMBAR JAMBI'.")
@@ -29,30 +82,47 @@ if uploaded_file:
     # Sidebar pilih sheet
     st.sidebar.header("Pilih Data")
     sheet_name = st.sidebar.selectbox("Pilih Sheet", valid_sheets)
-
-    # Baca sheet terpilih
-    df = pd.read_excel(uploaded_file, sheet_name=sheet_name)
-    df.columns = df.columns.str.strip().str.upper()
-    kolom_privasi = ["NAMA", "EMAIL", "NO HP", "NO. HP", "ALAMAT"]
-    df = df.drop(columns=[col for col in kolom_privasi if col in df.columns], errors="ignore")
+    mode_banding = len(valid_sheets) > 1 and st.sidebar.checkbox("Bandingkan semua sheet (periode)")
+
+    # Baca sheet terpilih (kolom privasi sudah dibuang & kolom status sudah dibersihkan saat ingestion)
+    with profil.tahap("muat_sheet") as t:
+        if mode_banding:
+            # Semua sheet valid di-parse paralel (satu proses per sheet), sheet terpilih ikut di dalamnya
+            semua_df = muat_semua_sheet(file_bytes, valid_sheets, file_hash)
+            df = semua_df[sheet_name]
+        else:
+            df = muat_sheet(file_bytes, sheet_name, file_hash)
+        t.baris_keluar = len(df)
     st.warning("🔒 Kolom privasi seperti NAMA, EMAIL, dan NO HP telah diabaikan otomatis.")
 
-
-    # Bersihkan kolom DATEL
-    if "DATEL" in df.columns:
-        df["DATEL"] = df["DATEL"].astype(str).str.strip().str.upper()
-    else:
+    if "DATEL" not in df.columns:
         st.error("Kolom 'DATEL' tidak ditemukan.")
         st.stop()
 
-    # Bersihkan kolom STATUS PAID
-    if "STATUS PAID" in df.columns:
-        df["STATUS PAID"] = df["STATUS PAID"].astype(str).str.strip().str.upper()
-
-    # Bersihkan kolom STATUS CARING
-    for col in ["STATUS CARING 1", "STATUS CARING 2", "STATUS CARING"]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper()
+    # Simpan ke riwayat (SQLite) secara inkremental; file yang sama tidak diproses ulang.
+    # Label periode bisa diganti; periode yang sudah berisi file lain hanya ditimpa setelah dikonfirmasi
+    if riwayat_aktif():
+        with profil.tahap("riwayat_simpan", len(df)), st.sidebar.expander("💾 Riwayat periode"):
+            for nama, data in (semua_df.items() if mode_banding else [(sheet_name, df)]):
+                if "DATEL" not in data.columns:
+                    continue
+                label = st.text_input(
+                    f"Label periode sheet {nama}", value=nama, key=f"periode_{file_hash}_{nama}"
+                ).strip()
+                if not label:
+                    continue
+                try:
+                    timpa = False
+                    if status_periode(label, file_hash) == "lain":
+                        timpa = st.checkbox(
+                            f"Timpa riwayat '{label}' (berisi file lain)", key=f"timpa_{file_hash}_{label}"
+                        )
+                        if not timpa:
+                            st.caption(f"'{label}' belum disimpan: ganti label atau centang timpa.")
+                            continue
+                    simpan_sheet(label, data, file_hash, timpa=timpa)
+                except Exception as e:
+                    st.warning(f"Riwayat '{label}' tidak tersimpan: {e}")
 
     # =========================
     # ======= PENAMBAHAN ======
@@ -60,71 +130,75 @@ if uploaded_file:
     # =========================
 
     # Fungsi bantu: bersihkan opsi (hilangkan duplikat, strip, upper)
-    def bersihkan_opsi(series):
-        if series is None:
-            return []
-        return sorted(set(series.dropna().astype(str).str.strip().str.upper()))
+    def bersihkan_opsi(nilai):
+        return sorted({str(v).strip().upper() for v in nilai})
 
     # =========================
     # FILTER SIDEBAR
     # =========================
+    # Kubus jumlah (DATEL x HABIT x STATUS PAID x STATUS CARING) dibangun sekali per sheet.
+    # Filter cukup menggabungkan mask di atas sel kubus, semua angka & chart dijawab
+    # dengan menjumlahkan sel, tanpa scan ulang baris sheet
+    with profil.tahap("kubus_normalisasi", len(df)) as t:
+        kubus = kubus_untuk(file_hash, sheet_name, df)
+        t.baris_keluar = len(kubus.cube)
+    indeks = kubus.indeks
+    # Daftar klausa filter; dipakai untuk mask sel kubus maupun (bila perlu) mask baris sheet
+    syarat = []
+
     st.sidebar.subheader("Filter Data")
 
     # Filter DATEL (tetap ada)
-    datel_list = sorted(df["DATEL"].dropna().unique())
+    datel_list = sorted(indeks.nilai_ada("DATEL"))
     selected_datel = st.sidebar.selectbox("Pilih DATEL", ["(Semua)"] + datel_list)
     if selected_datel != "(Semua)":
-        df = df[df["DATEL"] == selected_datel]
+        syarat.append([("DATEL", [selected_datel])])
 
     # (Opsional) multiselect DATEL tambahan — tidak mengganti selectbox di atas
     if len(datel_list) > 1:
         selected_datel_multi = st.sidebar.multiselect("Pilih beberapa DATEL (opsional)", datel_list)
         if selected_datel_multi:
-            df = df[df["DATEL"].isin(selected_datel_multi)]
+            syarat.append([("DATEL", selected_datel_multi)])
 
     # Filter HABIT
     if "HABIT" in df.columns:
-        habit_options = ["Semua"] + sorted(df["HABIT"].dropna().unique().tolist())
+        habit_options = ["Semua"] + sorted(indeks.nilai_ada("HABIT", indeks.mask_syarat(syarat)))
         selected_habit = st.sidebar.selectbox("Pilih Habit", habit_options)
         if selected_habit != "Semua":
-            df = df[df["HABIT"] == selected_habit]
+            syarat.append([("HABIT", [selected_habit])])
 
     # Filter Status Paid
     if "STATUS PAID" in df.columns:
-        paid_list = sorted(df["STATUS PAID"].dropna().unique())
+        paid_list = sorted(indeks.nilai_ada("STATUS PAID", indeks.mask_syarat(syarat)))
     # Default index: cari posisi "UNPAID", kalau tidak ada fallback ke 0 ("(Semua)")
     default_index = 0
     if "UNPAID" in paid_list:
         default_index = paid_list.index("UNPAID") + 1  # +1 karena "(Semua)" di index 0
     selected_paid = st.sidebar.selectbox("Status Paid", ["(Semua)"] + paid_list, index=default_index)
     if selected_paid != "(Semua)":
-        df = df[df["STATUS PAID"] == selected_paid]
+        syarat.append([("STATUS PAID", [selected_paid])])
 
 
     # Pilihan hasil caring
-    caring_choice = []
-    if "STATUS CARING 1" in df.columns and "STATUS CARING 2" in df.columns:
-        caring_choice = ["Semua", "Status Caring 1", "Status Caring 2"]
-    elif "STATUS CARING" in df.columns:
-        caring_choice = ["Status Caring"]
-    else:
+    caring_choice = pilihan_hasil_caring(df.columns)
+    if not caring_choice:
         st.error("Tidak ada kolom STATUS CARING yang valid.")
         st.stop()
 
     selected_hasil_caring = st.sidebar.selectbox("Pilih Hasil Caring", caring_choice)
 
     # Pilihan jenis status caring (dengan pembersihan supaya tidak kedouble)
+    mask = indeks.mask_syarat(syarat)
     if selected_hasil_caring == "Status Caring 1":
-        caring_options = bersihkan_opsi(df["STATUS CARING 1"])
+        caring_options = bersihkan_opsi(indeks.nilai_ada("STATUS CARING 1", mask))
     elif selected_hasil_caring == "Status Caring 2":
-        caring_options = bersihkan_opsi(df["STATUS CARING 2"])
+        caring_options = bersihkan_opsi(indeks.nilai_ada("STATUS CARING 2", mask))
     elif selected_hasil_caring == "Status Caring":
-        caring_options = bersihkan_opsi(df["STATUS CARING"])
+        caring_options = bersihkan_opsi(indeks.nilai_ada("STATUS CARING", mask))
     else:  # Semua
-        caring_options = bersihkan_opsi(pd.concat([
-            df.get("STATUS CARING 1", pd.Series(dtype=object)),
-            df.get("STATUS CARING 2", pd.Series(dtype=object))
-        ]))
+        caring_options = bersihkan_opsi(
+            indeks.nilai_ada("STATUS CARING 1", mask) + indeks.nilai_ada("STATUS CARING 2", mask)
+        )
 
     selected_jenis_caring = st.sidebar.selectbox(
         "Pilih Jenis Status Caring", ["(Semua)"] + caring_options
@@ -132,17 +206,25 @@ if uploaded_file:
 
     # Filter berdasarkan hasil caring & jenis caring
     if selected_jenis_caring != "(Semua)":
-        if selected_hasil_caring == "Status Caring 1":
-            df = df[df["STATUS CARING 1"] == selected_jenis_caring]
-        elif selected_hasil_caring == "Status Caring 2":
-            df = df[df["STATUS CARING 2"] == selected_jenis_caring]
-        elif selected_hasil_caring == "Status Caring":
-            df = df[df["STATUS CARING"] == selected_jenis_caring]
-        else:  # Semua
-            df = df[
-                (df["STATUS CARING 1"] == selected_jenis_caring)
-                | (df["STATUS CARING 2"] == selected_jenis_caring)
-            ]
+        syarat.append(klausa_caring(selected_hasil_caring, selected_jenis_caring))
+
+    # Kunci dependensi: section hanya dihitung ulang kalau data/filter yang dibacanya berubah
+    kunci_data = (file_hash, sheet_name)
+    kunci_filter = kunci_data + (tuple(tuple((kolom, tuple(nilai)) for kolom, nilai in klausa) for klausa in syarat),)
+
+    # Sel kubus yang lolos filter
+    with profil.tahap("filter", len(df)) as t:
+        sel = memo_bagian("sel", kunci_filter, lambda: kubus.potong(indeks.mask_syarat(syarat)))
+        t.baris_keluar = int(sel["JUMLAH"].sum())
+
+    # Tentukan kolom caring aktif untuk ringkasan
+    caring_col = kolom_caring_aktif(selected_hasil_caring, sel.columns)
+    kunci_ringkasan = kunci_filter + (caring_col,)
+
+    # Satu kali agregasi untuk kartu ringkas, tabel data kosong dan ringkasan AI
+    with profil.tahap("ringkasan", len(sel)) as t:
+        ringkasan = memo_bagian("ringkasan", kunci_ringkasan, lambda: hitung_ringkasan(sel, caring_col))
+        t.baris_keluar = len(ringkasan.per_datel)
 
     # =========================
     # ======= PENAMBAHAN ======
@@ -152,127 +234,46 @@ if uploaded_file:
     # Statistik Ringkas (summary cards)
     st.subheader("📌 Statistik Ringkas")
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Data", len(df))
-    col2.metric("Jumlah DATEL", df["DATEL"].nunique() if "DATEL" in df.columns else 0)
+    col1.metric("Total Data", ringkasan.total_data)
+    col2.metric("Jumlah DATEL", ringkasan.jumlah_datel)
 
-    if "STATUS PAID" in df.columns:
-        try:
-            paid_rate = (df["STATUS PAID"].str.upper().eq("PAID").mean() * 100)
-            col3.metric("Paid Rate", f"{paid_rate:.1f}%")
-        except Exception:
-            col3.metric("Paid Rate", "-")
+    if ringkasan.paid_rate is not None:
+        col3.metric("Paid Rate", f"{ringkasan.paid_rate:.1f}%")
     else:
         col3.metric("Paid Rate", "-")
 
     # Top status caring
-    top_caring_label = "-"
-    if "STATUS CARING 1" in df.columns and not df["STATUS CARING 1"].dropna().empty:
-        try:
-            top_caring_label = df["STATUS CARING 1"].mode()[0]
-        except Exception:
-            top_caring_label = df["STATUS CARING 1"].dropna().iloc[0]
-    col4.metric("Status Caring Terbanyak", top_caring_label)
+    col4.metric("Status Caring Terbanyak", ringkasan.top_caring)
 
     # =========================
     # CHART DISTRIBUSI ========
     # =========================
-    st.subheader("Distribusi Status Caring")
-
-    # Pilihan jenis tampilan chart
-    tampilan_chart = st.radio(
-        "Tampilkan berdasarkan:",
-        ["Status Asli", "Kategori Caring"],
-        horizontal=True
-    )
+    # Fragment: ganti radio tampilan hanya menjalankan ulang section ini
+    @st.fragment
+    def bagian_chart(sel, hasil_caring, kunci_filter):
+        st.subheader("Distribusi Status Caring")
+
+        # Pilihan jenis tampilan chart
+        tampilan_chart = st.radio(
+            "Tampilkan berdasarkan:",
+            ["Status Asli", "Kategori Caring"],
+            horizontal=True
+        )
+
+        # ================================
+        # TAMPAILKAN CHART SESUAI PILIHAN
+        # ================================
+
+        # Normalisasi status & kategori caring sudah tersimpan per sel kubus
+        with profil_fragment("bagian_chart") as p, p.tahap("chart_distribusi", len(sel)):
+            chart = memo_bagian(
+                "chart", kunci_filter + (hasil_caring, tampilan_chart),
+                lambda: daftar_chart(sel, hasil_caring, tampilan_chart),
+            )
+            for jumlah, label, judul, key in chart:
+                st.plotly_chart(pie(jumlah, label, judul), use_container_width=True, key=key)
 
-    # Fungsi pie chart
-    def buat_chart(data, kolom, judul):
-        count_df = data[kolom].value_counts().reset_index()
-        count_df.columns = [kolom, "JUMLAH"]
-        fig = px.pie(count_df, names=kolom, values="JUMLAH", title=judul)
-        fig.update_traces(textinfo="percent+label", textfont_size=8)
-        return fig
-
-    # Normalisasi status
-    valid_statuses = [
-        "RNA", "TIDAK ADA NO KONTAK", "TIDAK AKTIF", "SALAH SAMBUNG", "REJECTED",
-        "COMPLAINT LAYANAN", "INGIN CABUT", "SUDAH BERHENTI BERLANGGANAN",
-        "RESPONS OK", "LUNAS/PAID"
-    ]
-
-    def normalisasi_status(status):
-        status = str(status).strip().upper()
-        match = process.extractOne(status, valid_statuses, score_cutoff=70)
-        return match[0] if match else status
-
-    # Kategori caring
-    kategori_dict = {
-        "UNCONTACTABLE": ["RNA", "TIDAK ADA NO KONTAK", "TIDAK AKTIF", "SALAH SAMBUNG", "REJECTED"],
-        "ISSUED": ["COMPLAINT LAYANAN", "INGIN CABUT"],
-        "NOT YET": ["SUDAH BERHENTI BERLANGGANAN", "", "NAN", "NONE", "NULL", "-", "0"],
-        "JANJI BAYAR": ["RESPONS OK"],
-        "PAID": ["LUNAS", "PAID", "LUNAS/PAID"],
-        "ZERO BILLING": ["ZERO BILLING"]
-    }
-
-    all_keywords = [(kat, val) for kat, values in kategori_dict.items() for val in values]
-
-    def kategori_keywords(status):
-        status = str(status).strip().upper()
-        best_match = process.extractOne(status, [val for _, val in all_keywords], score_cutoff=70)
-        if best_match:
-            matched_val = best_match[0]
-            for kategori, values in kategori_dict.items():
-                if matched_val in values:
-                    return kategori
-        return "LAINNYA"
-
-    # Salin dataframe utama agar tidak merusak aslinya
-    df_chart = df.copy()
-
-    # ================================
-    # TAMPAILKAN CHART SESUAI PILIHAN
-    # ================================
-
-    if tampilan_chart == "Status Asli":
-        for kolom in ["STATUS CARING 1", "STATUS CARING 2", "STATUS CARING"]:
-            if kolom in df_chart.columns:
-                df_chart[kolom] = df_chart[kolom].fillna("").astype(str).str.strip().str.upper()
-                df_chart[kolom] = df_chart[kolom].apply(normalisasi_status)
-
-        if selected_hasil_caring == "Status Caring 1":
-            st.plotly_chart(buat_chart(df_chart, "STATUS CARING 1", "Distribusi Status Caring 1"), use_container_width=True, key="asli_status_1")
-        elif selected_hasil_caring == "Status Caring 2":
-            st.plotly_chart(buat_chart(df_chart, "STATUS CARING 2", "Distribusi Status Caring 2"), use_container_width=True, key="asli_status_2")
-        elif selected_hasil_caring == "Status Caring":
-            st.plotly_chart(buat_chart(df_chart, "STATUS CARING", "Distribusi Status Caring"), use_container_width=True, key="asli_status_total")
-        else:  # Semua
-            if "STATUS CARING 1" in df_chart.columns:
-                st.plotly_chart(buat_chart(df_chart, "STATUS CARING 1", "Distribusi Status Caring 1"), use_container_width=True, key="asli_status_all_1")
-            if "STATUS CARING 2" in df_chart.columns:
-                st.plotly_chart(buat_chart(df_chart, "STATUS CARING 2", "Distribusi Status Caring 2"), use_container_width=True, key="asli_status_all_2")
-
-    elif tampilan_chart == "Kategori Caring":
-        if selected_hasil_caring == "Status Caring 1":
-            df_chart["KATEGORI CARING"] = df_chart["STATUS CARING 1"].apply(kategori_keywords)
-            st.plotly_chart(buat_chart(df_chart, "KATEGORI CARING", "Distribusi Kategori Caring 1"), use_container_width=True, key="kategori_status_1")
-
-        elif selected_hasil_caring == "Status Caring 2":
-            df_chart["KATEGORI CARING"] = df_chart["STATUS CARING 2"].apply(kategori_keywords)
-            st.plotly_chart(buat_chart(df_chart, "KATEGORI CARING", "Distribusi Kategori Caring 2"), use_container_width=True, key="kategori_status_2")
-
-        elif selected_hasil_caring == "Status Caring":
-            df_chart["KATEGORI CARING"] = df_chart["STATUS CARING"].apply(kategori_keywords)
-            st.plotly_chart(buat_chart(df_chart, "KATEGORI CARING", "Distribusi Kategori Caring"), use_container_width=True, key="kategori_status_total")
-
-        else:  # Semua
-            if "STATUS CARING 1" in df_chart.columns:
-                df_chart["KATEGORI CARING 1"] = df_chart["STATUS CARING 1"].apply(kategori_keywords)
-                st.plotly_chart(buat_chart(df_chart, "KATEGORI CARING 1", "Distribusi Kategori Caring 1"), use_container_width=True, key="kategori_all_1")
-
-            if "STATUS CARING 2" in df_chart.columns:
-                df_chart["KATEGORI CARING 2"] = df_chart["STATUS CARING 2"].apply(kategori_keywords)
-                st.plotly_chart(buat_chart(df_chart, "KATEGORI CARING 2", "Distribusi Kategori Caring 2"), use_container_width=True, key="kategori_all_2")
+    bagian_chart(sel, selected_hasil_caring, kunci_filter)
 
 
     # =======================================================
@@ -280,182 +281,174 @@ if uploaded_file:
     # ========================================================
     st.subheader("📌 Ringkasan Data Kosong pada Status Caring")
 
-    # Pastikan kolom DATEL bersih
-    df["DATEL"] = df["DATEL"].fillna("").astype(str).str.strip().str.upper()
-    df = df[df["DATEL"] != ""]
-
-    # Fungsi bantu: ambil jumlah kosong per DATEL dari kolom tertentu
-    def jumlah_kosong_per_datel(df, kolom, nama_output):
-        if kolom not in df.columns:
-            return pd.DataFrame(columns=["DATEL", nama_output])
-        temp = df[[kolom, "DATEL"]].copy()
-        temp[kolom] = temp[kolom].fillna("").astype(str).str.strip().str.upper()
-        temp = temp[temp[kolom].isin(["", "NAN", "NONE", "NULL", "-"])]
-        return temp.groupby("DATEL").size().reset_index(name=nama_output)
+    # Logic sesuai pilihan caring (DATEL kosong sudah diabaikan di ringkasan)
+    with profil.tahap("data_kosong") as t:
+        daftar_kosong = kolom_kosong(selected_hasil_caring)
+        tabel_kosong = memo_bagian(
+            "kosong", kunci_ringkasan + tuple(daftar_kosong), lambda: ringkasan.tabel_kosong(daftar_kosong)
+        )
+        t.baris_keluar = len(tabel_kosong)
 
-    # Logic sesuai pilihan caring
-    if selected_hasil_caring == "Status Caring 1":
-        kosong1 = jumlah_kosong_per_datel(df, "STATUS CARING 1", "JUMLAH KOSONG CARING 1")
-        
-        if kosong1.empty:
-            st.success("✅ Tidak ada data kosong pada kolom STATUS CARING 1.")
+        if tabel_kosong.empty:
+            st.success(f"✅ Tidak ada data kosong pada kolom {' maupun '.join(daftar_kosong)}.")
         else:
-            kosong1 = kosong1.sort_values(by="JUMLAH KOSONG CARING 1", ascending=False).reset_index(drop=True)
-            st.dataframe(kosong1, use_container_width=True)
+            tabel_halaman(tabel_kosong, "tabel_kosong", use_container_width=True)
+            st.plotly_chart(bar_kosong(tabel_kosong, daftar_kosong), use_container_width=True)
 
-            fig = px.bar(kosong1, x="DATEL", y="JUMLAH KOSONG CARING 1",
-                        title="Distribusi Data Kosong Status Caring 1 per DATEL",
-                        text="JUMLAH KOSONG CARING 1")
-            fig.update_traces(textposition="outside")
-            st.plotly_chart(fig, use_container_width=True)
+    # ===========================
+    # UNDUH DATA TERFILTER
+    # ===========================
+    # Fragment: pilihan format tidak menjalankan ulang dashboard. File baru dibuat saat tombol diklik,
+    # per potongan dari mask baris filter (kolom privasi tetap tidak ikut)
+    @st.fragment
+    def bagian_ekspor(df, file_hash, sheet_name, syarat, jumlah_baris):
+        st.subheader("📥 Unduh Data Terfilter")
+        st.caption(f"{jumlah_baris} baris sesuai filter sidebar, ditambah status ternormalisasi & KATEGORI CARING.")
+
+        format_ekspor = st.radio("Format file", list(FORMAT_EKSPOR), horizontal=True, key="format_ekspor")
+
+        def buat_file():
+            # Dipanggil saat tombol diklik (setelah run selesai), jadi selalu tercatat sebagai rerun sendiri
+            with profil_fragment("bagian_ekspor", tampilkan=False) as p, p.tahap("ekspor", jumlah_baris):
+                mask_baris = indeks_untuk(file_hash, sheet_name, df).mask_syarat(syarat)
+                return ekspor_ke_file_sementara(df, mask_baris, format_ekspor)
+
+        st.download_button(
+            "⬇️ Unduh",
+            data=buat_file,
+            file_name=nama_file_ekspor(sheet_name, format_ekspor),
+            mime=FORMAT_EKSPOR[format_ekspor][1],
+            disabled=jumlah_baris == 0,
+            on_click="ignore",
+        )
+
+    bagian_ekspor(df, file_hash, sheet_name, syarat, int(sel["JUMLAH"].sum()))
 
-    elif selected_hasil_caring == "Status Caring 2":
-        kosong2 = jumlah_kosong_per_datel(df, "STATUS CARING 2", "JUMLAH KOSONG CARING 2")
-        
-        if kosong2.empty:
-            st.success("✅ Tidak ada data kosong pada kolom STATUS CARING 2.")
-        else:
-            kosong2 = kosong2.sort_values(by="JUMLAH KOSONG CARING 2", ascending=False).reset_index(drop=True)
-            st.dataframe(kosong2, use_container_width=True)
+    # ===========================
+    # PERBANDINGAN ANTAR SHEET
+    # ===========================
+    # Fragment: tidak membaca filter sidebar, ganti kolom perbandingan hanya menjalankan ulang section ini
+    @st.fragment
+    def bagian_banding(file_hash, semua_df):
+        st.subheader("📈 Perbandingan Antar Sheet")
+        st.caption("Dihitung dari seluruh baris tiap sheet, tanpa filter sidebar.")
+
+        kolom_banding_opsi = [
+            cc for cc in kolom_caring if all(cc in data.columns for data in semua_df.values())
+        ]
+        if not kolom_banding_opsi:
+            st.info("Tidak ada kolom STATUS CARING yang sama di semua sheet.")
+            return
+
+        kolom_banding = st.selectbox("Kolom caring untuk perbandingan", kolom_banding_opsi)
+        baris_masuk = sum(len(data) for data in semua_df.values())
+        with profil_fragment("bagian_banding") as p, p.tahap("banding_sheet", baris_masuk) as t:
+            banding_datel, banding_kategori = memo_bagian(
+                "banding", (file_hash, tuple(semua_df), kolom_banding),
+                lambda: bandingkan_sheet(
+                    {nama: kubus_untuk(file_hash, nama, data) for nama, data in semua_df.items()}, kolom_banding
+                ),
+            )
+            t.baris_keluar = len(banding_datel)
 
-            fig = px.bar(kosong2, x="DATEL", y="JUMLAH KOSONG CARING 2",
-                        title="Distribusi Data Kosong Status Caring 2 per DATEL",
-                        text="JUMLAH KOSONG CARING 2")
-            fig.update_traces(textposition="outside")
-            st.plotly_chart(fig, use_container_width=True)
+        tabel_halaman(banding_datel, "tabel_banding", use_container_width=True)
 
-    else:
-        # Gabungan Status Caring 1 dan 2
-        kosong1 = jumlah_kosong_per_datel(df, "STATUS CARING 1", "JUMLAH KOSONG CARING 1")
-        kosong2 = jumlah_kosong_per_datel(df, "STATUS CARING 2", "JUMLAH KOSONG CARING 2")
+        fig = px_figure("bar", banding_datel, x="DATEL", y="PAID RATE", color="SHEET", barmode="group",
+                        title="Paid Rate per DATEL antar Sheet", text="PAID RATE",
+                        traces={"textposition": "outside"})
+        st.plotly_chart(fig, use_container_width=True, key="banding_paid")
 
-        if kosong1.empty and kosong2.empty:
-            st.success("✅ Tidak ada data kosong pada kolom STATUS CARING 1 maupun STATUS CARING 2.")
-        else:
-            df_kosong = pd.merge(kosong1, kosong2, on="DATEL", how="outer").fillna(0)
-            df_kosong["JUMLAH KOSONG CARING 1"] = df_kosong["JUMLAH KOSONG CARING 1"].astype(int)
-            df_kosong["JUMLAH KOSONG CARING 2"] = df_kosong["JUMLAH KOSONG CARING 2"].astype(int)
-
-            df_kosong = df_kosong.sort_values(
-                by=["JUMLAH KOSONG CARING 1", "JUMLAH KOSONG CARING 2"],
-                ascending=False
-            ).reset_index(drop=True)
-
-            st.dataframe(df_kosong, use_container_width=True)
-
-            fig = px.bar(
-                df_kosong,
-                x="DATEL",
-                y=["JUMLAH KOSONG CARING 1", "JUMLAH KOSONG CARING 2"],
-                title="Distribusi Data Kosong Status Caring 1 & 2 per DATEL",
-                barmode="stack"
-            )
-            fig.update_traces(texttemplate='%{y}', textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
+        fig = px_figure("bar", banding_kategori, x="SHEET", y="JUMLAH", color="KATEGORI CARING",
+                        facet_col="DATEL", facet_col_wrap=3,
+                        title=f"Campuran Kategori Caring per DATEL ({kolom_banding})")
+        st.plotly_chart(fig, use_container_width=True, key="banding_kategori")
+
+        fig = px_figure("bar", banding_datel, x="DATEL", y="JUMLAH KOSONG", color="SHEET", barmode="group",
+                        title=f"Jumlah Data Kosong {kolom_banding} per DATEL antar Sheet")
+        st.plotly_chart(fig, use_container_width=True, key="banding_kosong")
+
+    if mode_banding:
+        bagian_banding(file_hash, semua_df)
+
+    # ===========================
+    # TREN DARI RIWAYAT
+    # ===========================
+    # Fragment: hanya membaca isi riwayat (kunci = waktu update tiap periode), bukan filter sidebar
+    @st.fragment
+    def bagian_tren(kolom_tersedia):
+        with profil_fragment("bagian_tren") as p, p.tahap("riwayat_tren"):
+            periode = daftar_periode()
+            if len(periode) < 2:
+                return
+            kunci_riwayat = tuple(zip(periode["PERIODE"], periode["DIPERBARUI"]))
+            st.subheader("🗂️ Tren dari Riwayat Upload")
+            st.caption(f"Dari {len(periode)} periode tersimpan (urut sesuai waktu pertama di-upload), tanpa filter sidebar.")
+
+            tren_paid = memo_bagian("tren_paid", kunci_riwayat, tren_paid_rate)
+            fig = px_figure("line", tren_paid, x="PERIODE", y="PAID RATE", color="DATEL", markers=True,
+                            title="Tren Paid Rate per DATEL")
+            st.plotly_chart(fig, use_container_width=True, key="tren_paid")
+
+            kolom_tren = st.selectbox("Kolom caring untuk tren", kolom_tersedia)
+            tren = memo_bagian("tren_kategori", kunci_riwayat + (kolom_tren,), lambda: tren_kategori(kolom_tren))
+            fig = px_figure("bar", tren, x="PERIODE", y="JUMLAH", color="KATEGORI CARING",
+                            facet_col="DATEL", facet_col_wrap=3,
+                            title=f"Tren Kategori Caring per DATEL ({kolom_tren})")
+            st.plotly_chart(fig, use_container_width=True, key="tren_kategori")
+
+    if riwayat_aktif():
+        bagian_tren([cc for cc in kolom_caring if cc in df.columns])
 
-    
     # ===========================
     # AI GEMINI – SOLUSI OTOMATIS
     # ===========================
-    st.subheader("🤖 Solusi Otomatis dari AI (Gemini)")
-
-    if gemini_api_key:
-        genai.configure(api_key=gemini_api_key)
-
-        # Tentukan kolom caring aktif untuk ringkasan
-        caring_col = None
-        if selected_hasil_caring == "Status Caring 1" and "STATUS CARING 1" in df.columns:
-            caring_col = "STATUS CARING 1"
-        elif selected_hasil_caring == "Status Caring 2" and "STATUS CARING 2" in df.columns:
-            caring_col = "STATUS CARING 2"
-        elif selected_hasil_caring == "Status Caring" and "STATUS CARING" in df.columns:
-            caring_col = "STATUS CARING"
-
-        # Bangun ringkasan aman (tanpa KeyError)
-        try:
-            paid_dist = df["STATUS PAID"].value_counts().to_dict() if "STATUS PAID" in df.columns else "-"
-        except Exception:
-            paid_dist = "-"
-
-        try:
-            if caring_col:
-                caring_dist = df[caring_col].value_counts().to_dict()
-            else:
-                stacks = []
-                for cc in ["STATUS CARING 1", "STATUS CARING 2", "STATUS CARING"]:
-                    if cc in df.columns:
-                        stacks.append(df[cc])
-                caring_dist = pd.concat(stacks, ignore_index=True).value_counts().to_dict() if stacks else "-"
-        except Exception:
-            caring_dist = "-"
-
-        try:
-            if "STATUS PAID" in df.columns and "DATEL" in df.columns:
-                unpaid_rank = (
-                    df.assign(_PAID=df["STATUS PAID"].astype(str).str.upper())
-                      .query('_PAID != "PAID"')
-                      .groupby("DATEL").size()
-                      .sort_values(ascending=False)
-                      .head(5)
-                      .to_dict()
-                )
-            else:
-                unpaid_rank = "-"
-        except Exception:
-            unpaid_rank = "-"
-
-        # hitung jumlah kosong di kolom caring aktif (jika ada)
-        try:
-            if caring_col and caring_col in df.columns:
-                kosong_count = int((df[caring_col].isna() | (df[caring_col].str.strip() == "")).sum())
-            else:
-                kosong_count = "-"
-        except Exception:
-            kosong_count = "-"
-
-        summary = f"""
-Total baris: {len(df)}
-Jumlah DATEL unik: {df['DATEL'].nunique() if 'DATEL' in df.columns else 0}
-Distribusi STATUS PAID: {paid_dist}
-Distribusi STATUS CARING (aktif/combined): {caring_dist}
-Top 5 DATEL unpaid (estimasi): {unpaid_rank}
-Jumlah data kosong di kolom caring aktif: {kosong_count}
-Status caring terbanyak (mode caring 1): {top_caring_label}
-"""
+    summary = ringkasan.teks_ai()
+
+    # Fragment: klik tombol hanya menjalankan ulang section AI, bukan seluruh dashboard
+    @st.fragment
+    def bagian_ai(summary, syarat, caring_col, kunci_ringkasan):
+        st.subheader("🤖 Solusi Otomatis dari AI (Gemini)")
+
+        gemini_api_key = baca_api_key()
+        if not (gemini_api_key or mode_stub()):
+            st.info("Masukkan Gemini API Key di sidebar untuk mengaktifkan solusi otomatis AI.")
+            return
 
         # Tombol untuk menjalankan solusi otomatis
         if st.button("🔎 Jalankan Analisis & Solusi Otomatis"):
-            prompt = f"""
-Kamu adalah AI analis Collection. Berdasarkan ringkasan berikut, buat SOLUSI OTOMATIS dengan fokus hanya pada 4 status utama: UNCONTACTABLE, ISSUED, NOT YET, JANJI BAYAR.
-
-Format jawaban:
-1) Prioritas Tindakan (bullet per DATEL, hanya untuk 4 status ini)
-2) Quick Wins 7 Hari (Hari 1–7, aksi harian spesifik)
-3) Solusi untuk Uncontactable (alternatif multi-channel, data sekunder, kunjungan lapangan) fokuskan
-4) baca kolom ADDITIONAL INFO dari file yang di upload, khususnya pada jenis caring SALAH SAMBUNG dan COMPLAINT LAYANAN. Berikan solusi terbaik dari kolom tersebut
-
-
-Syarat:
-- Sebutkan DATEL paling berisiko berdasarkan data Caring 2.
-- Untuk setiap DATEL, jelaskan tindakan sesuai status dominan (Uncontactable, Issued, Not Yet, Janji Bayar).
-- Quick wins harus kuantitatif (contoh: Uncontactable ↓20% dalam 7 hari, 50% Janji Bayar terealisasi).
-- Solusi harus singkat, to the point, actionable.
-Ringkasan data:
-
-{summary}
-
-"""
-
-            try:
-                model = genai.GenerativeModel("gemini-1.5-flash")
-                resp = model.generate_content(prompt)
-                ai_text = resp.text if hasattr(resp, "text") else str(resp)
-                st.markdown("### 💡 Hasil Analisis & Solusi AI")
-                st.write(ai_text)
-            except Exception as e:
-                st.error(f"Gagal memanggil Gemini: {e}")
-    else:
-        st.info("Masukkan Gemini API Key di sidebar untuk mengaktifkan solusi otomatis AI.")
+            # Jawaban di-cache per ringkasan, di-stream per potongan, dengan timeout & retry terbatas
+            klien = klien_untuk(gemini_api_key)
+            with profil_fragment("bagian_ai") as p:
+                try:
+                    # Catatan ADDITIONAL INFO untuk SALAH SAMBUNG & COMPLAINT LAYANAN dikirim sebagai
+                    # digest berkelompok dengan budget token, bukan teks mentah
+                    with p.tahap("ai_digest", len(df)):
+                        digest = memo_bagian(
+                            "digest", kunci_ringkasan,
+                            lambda: digest_untuk(df, file_hash, sheet_name, syarat, caring_col),
+                        )
+                    if digest:
+                        summary = f"{summary}\n{digest}\n"
+
+                    st.markdown("### 💡 Hasil Analisis & Solusi AI")
+                    with p.tahap("ai_gemini"):
+                        st.write_stream(klien.analisis_stream(summary))
+                except Exception as e:
+                    st.error(f"Gagal memanggil Gemini: {e}")
+
+    bagian_ai(summary, syarat, caring_col, kunci_ringkasan)
+
+    # ===========================
+    # PANEL DEBUG (PROFILING)
+    # ===========================
+    st.sidebar.divider()
+    panel_profil = st.sidebar.checkbox("🐞 Panel debug (profiling)", value=aktif_dari_env(), key="panel_profil")
+    # Selalu ditutup di akhir full run, supaya rerun fragment berikutnya mencatat ke Profiler sendiri
+    profil.selesai()
+    if panel_profil:
+        with st.sidebar.expander("Waktu & memori per tahap", expanded=True):
+            st.dataframe(pd.DataFrame(profil.catatan).drop(columns="rerun"), hide_index=True)
+            st.caption(f"Rerun {profil.rerun} · total {profil.total_detik():.3f} detik · log JSON di stderr")
 
 else:
     st.info("Silakan upload file Excel terlebih dahulu.")
\ No newline at end of file
@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from core import chart_kosong, chart_pie, daftar_chart, kolom_kosong, proses_sheet, sheet_valid
+from ingest import hash_konten
+
+# =========================
+# LAPORAN BATCH (TANPA STREAMLIT)
+# =========================
+# Contoh:
+#   python MAGANG/batch.py folder_workbook -o laporan --workers 4 --format parquet
+# Tiap workbook diproses di proses terpisah, hasil per sheet ditulis ke laporan/<workbook>/<sheet>/
+
+TAMPILAN_CHART = ["Status Asli", "Kategori Caring"]
+
+
+def nama_aman(nama):
+    return re.sub(r"[^0-9A-Za-z._-]+", "_", nama).strip("_") or "sheet"
+
+
+def tulis_tabel(df, path, format_keluaran):
+    if format_keluaran == "parquet":
+        df.to_parquet(path.with_suffix(".parquet"), index=False)
+    else:
+        df.to_csv(path.with_suffix(".csv"), index=False)
+
+
+def _nilai_json(nilai):
+    if isinstance(nilai, dict):
+        return {str(k): _nilai_json(v) for k, v in nilai.items()}
+    if hasattr(nilai, "item"):
+        return nilai.item()
+    return nilai
+
+
+# =========================
+# PROSES SATU WORKBOOK
+# =========================
+def tulis_sheet(hasil, folder, format_keluaran, html):
+    folder.mkdir(parents=True, exist_ok=True)
+    ringkasan = hasil.ringkasan
+    hasil_caring = hasil.hasil_caring
+
+    info = {
+        "sheet": hasil.sheet_name,
+        "hasil_caring": hasil_caring,
+        "total_data": ringkasan.total_data,
+        "jumlah_datel": ringkasan.jumlah_datel,
+        "paid_rate": ringkasan.paid_rate,
+        "top_caring": ringkasan.top_caring,
+        "paid_dist": ringkasan.paid_dist,
+        "caring_dist": ringkasan.caring_dist,
+        "unpaid_rank": ringkasan.unpaid_rank,
+        "kosong_count": ringkasan.kosong_count,
+    }
+    with open(folder / "ringkasan.json", "w", encoding="utf-8") as f:
+        json.dump(_nilai_json(info), f, ensure_ascii=False, indent=2)
+
+    # Angka per DATEL (kolom BLANK hanya dipakai internal untuk ringkasan AI)
+    per_datel = ringkasan.per_datel.drop(
+        columns=[k for k in ringkasan.per_datel.columns if k.startswith("BLANK ")]
+    ).rename_axis("DATEL").reset_index()
+    per_datel["DATEL"] = per_datel["DATEL"].astype(str)
+    tulis_tabel(per_datel, folder / "per_datel", format_keluaran)
+
+    # Distribusi status asli & kategori dalam format panjang: TAMPILAN, KOLOM, NILAI, JUMLAH
+    distribusi = []
+    for tampilan in TAMPILAN_CHART:
+        for jumlah, label, judul, key in daftar_chart(hasil.sel, hasil_caring, tampilan):
+            distribusi.append(pd.DataFrame({
+                "TAMPILAN": tampilan,
+                "KOLOM": judul.replace("Distribusi ", ""),
+                "NILAI": jumlah.index.astype(str),
+                "JUMLAH": jumlah.to_numpy(),
+            }))
+            if html:
+                chart_pie(jumlah, label, judul).write_html(folder / f"{key}.html", include_plotlyjs="cdn")
+    if distribusi:
+        tulis_tabel(pd.concat(distribusi, ignore_index=True), folder / "distribusi", format_keluaran)
+
+    daftar_kosong = kolom_kosong(hasil_caring)
+    tabel_kosong = ringkasan.tabel_kosong(daftar_kosong)
+    tulis_tabel(tabel_kosong, folder / "kosong", format_keluaran)
+    if html and not tabel_kosong.empty:
+        chart_kosong(tabel_kosong, daftar_kosong).write_html(folder / "kosong.html", include_plotlyjs="cdn")
+
+
+def proses_workbook(path, folder_keluaran, filter_sheet, format_keluaran, html):
+    path = Path(path)
+    file_bytes = path.read_bytes()
+    file_hash = hash_konten(file_bytes)
+    status = {}
+    for sheet_name in sheet_valid(file_bytes, file_hash):
+        try:
+            hasil = proses_sheet(file_bytes, sheet_name, file_hash, **filter_sheet)
+        except ValueError as e:
+            status[sheet_name] = str(e)
+            continue
+        folder = Path(folder_keluaran) / nama_aman(path.stem) / nama_aman(sheet_name)
+        tulis_sheet(hasil, folder, format_keluaran, html)
+        status[sheet_name] = "ok"
+    return str(path), status
+
+
+# =========================
+# CLI
+# =========================
+def baca_argumen(argv=None):
+    parser = argparse.ArgumentParser(description="Laporan caring C3MR per sheet tanpa Streamlit")
+    parser.add_argument("input", help="Folder berisi workbook .xlsx (atau satu file .xlsx)")
+    parser.add_argument("-o", "--output", default="laporan_caring", help="Folder hasil")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses (default: jumlah core)")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--no-html", action="store_true", help="Jangan tulis chart HTML")
+    parser.add_argument("--hasil-caring", choices=["Semua", "Status Caring 1", "Status Caring 2", "Status Caring"])
+    parser.add_argument("--datel", action="append", help="Filter DATEL (boleh diulang)")
+    parser.add_argument("--habit")
+    parser.add_argument("--paid", help="Filter STATUS PAID, mis. UNPAID")
+    parser.add_argument("--jenis-caring", help="Filter jenis status caring, mis. JANJI BAYAR")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = baca_argumen(argv)
+    sumber = Path(args.input)
+    if sumber.is_dir():
+        daftar = sorted(p for p in sumber.glob("*.xlsx") if not p.name.startswith("~$"))
+    else:
+        daftar = [sumber]
+    if not daftar:
+        print(f"Tidak ada file .xlsx di {sumber}", file=sys.stderr)
+        return 1
+
+    filter_sheet = {
+        "hasil_caring": args.hasil_caring,
+        "datel_multi": args.datel,
+        "habit": args.habit,
+        "paid": args.paid,
+        "jenis_caring": args.jenis_caring,
+    }
+    Path(args.output).mkdir(parents=True, exist_ok=True)
+    maks_worker = min(args.workers or os.cpu_count() or 1, len(daftar))
+
+    gagal = 0
+    if maks_worker <= 1:
+        for p in daftar:
+            try:
+                path, status = proses_workbook(p, args.output, filter_sheet, args.format, not args.no_html)
+            except Exception as e:
+                gagal += _laporkan_gagal(p, e)
+                continue
+            gagal += _laporkan(path, status)
+    else:
+        with ProcessPoolExecutor(max_workers=maks_worker) as pool:
+            futures = {
+                pool.submit(proses_workbook, p, args.output, filter_sheet, args.format, not args.no_html): p
+                for p in daftar
+            }
+            for future in as_completed(futures):
+                try:
+                    path, status = future.result()
+                except Exception as e:
+                    gagal += _laporkan_gagal(futures[future], e)
+                    continue
+                gagal += _laporkan(path, status)
+    return 1 if gagal else 0
+
+
+def _laporkan_gagal(path, error):
+    # Workbook rusak / tidak terbaca: dilaporkan, workbook lain tetap diproses
+    print(f"{path}: GAGAL ({error})", file=sys.stderr)
+    return 1
+
+
+def _laporkan(path, status):
+    # Hasil: banyaknya sheet yang gagal (status selain "ok"), supaya exit code ikut mencerminkannya
+    if not status:
+        print(f"{path}: tidak ada sheet 'SUMBAR JAMBI'", file=sys.stderr)
+        return 1
+    gagal = 0
+    for sheet_name, pesan in status.items():
+        if pesan == "ok":
+            print(f"{path} [{sheet_name}]: ok")
+        else:
+            print(f"{path} [{sheet_name}]: GAGAL ({pesan})", file=sys.stderr)
+            gagal += 1
+    return gagal
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import normalisasi
+from ai_client import CacheJawaban, KlienAI, ModelStub
+from core import buat_syarat, digest_untuk, kolom_kosong
+from filter_index import IndeksFilter
+from ingest import baca_sheet_streaming, bersihkan_sheet, hash_konten
+from kubus import KubusHitung, hitung_ringkasan
+
+# =========================
+# BENCHMARK PIPELINE CARING
+# =========================
+# Contoh:
+#   python MAGANG/benchmark.py                          # 10k, 100k, 1M baris
+#   python MAGANG/benchmark.py --baris 10000 100000 -o hasil.json --banding hasil_lama.json
+#   python MAGANG/benchmark.py --cek-saja               # cek regresi kebenaran saja (juga jalan sebelum benchmark)
+# Workbook sintetis disimpan di --folder-data supaya tidak dibuat ulang setiap kali jalan.
+
+UKURAN_DEFAULT = [10_000, 100_000, 1_000_000]
+NAMA_SHEET = "SUMBAR JAMBI BENCH"
+# Tahap dianggap regresi kalau lebih lambat dari batas ini dibanding hasil acuan
+AMBANG_REGRESI = 1.2
+
+# Proporsi kira-kira seperti data caring C3MR
+DATEL = {
+    "PADANG": 0.22, "BUKITTINGGI": 0.14, "SOLOK": 0.10, "PAYAKUMBUH": 0.09, "PARIAMAN": 0.07,
+    "JAMBI": 0.18, "MUARA BUNGO": 0.08, "KUALA TUNGKAL": 0.06, "SAROLANGUN": 0.06,
+}
+HABIT = {"RAJIN": 0.35, "TELAT": 0.30, "NUNGGAK": 0.20, "BARU": 0.15}
+STATUS_PAID = {"UNPAID": 0.68, "PAID": 0.32}
+STATUS_CARING = {
+    "RNA": 0.20, "TIDAK ADA NO KONTAK": 0.08, "TIDAK AKTIF": 0.07, "SALAH SAMBUNG": 0.09,
+    "REJECTED": 0.06, "COMPLAINT LAYANAN": 0.07, "INGIN CABUT": 0.04,
+    "SUDAH BERHENTI BERLANGGANAN": 0.03, "RESPONS OK": 0.14, "LUNAS/PAID": 0.09,
+    "ZERO BILLING": 0.03, "": 0.06, "-": 0.02, "NULL": 0.01, None: 0.01,
+}
+INFO = [
+    "nomor salah, milik orang lain", "nomor salah milik org lain", "no tlp bukan pelanggan",
+    "gangguan internet lambat", "internet lambat sering putus", "minta teknisi datang",
+    "tagihan tidak sesuai", "komplain tagihan naik", "sudah pindah rumah", None,
+]
+# Porsi status caring yang ditulis "berantakan" supaya matcher fuzzy ikut teruji
+PORSI_NOISE = 0.15
+
+
+# =========================
+# GENERATOR WORKBOOK SINTETIS
+# =========================
+def _pilih(rng, distribusi, n):
+    nilai = np.array(list(distribusi), dtype=object)
+    peluang = np.array(list(distribusi.values()), dtype=float)
+    return rng.choice(nilai, n, p=peluang / peluang.sum())
+
+
+def _acak_ejaan(rng, teks):
+    # Salah ketik khas input manual: huruf kecil, spasi ekor, huruf hilang/tertukar/dobel
+    if not teks or len(teks) < 3:
+        return teks
+    jenis = rng.integers(6)
+    i = int(rng.integers(1, len(teks) - 1))
+    if jenis == 0:
+        return teks.lower()
+    if jenis == 1:
+        return teks.title() + " "
+    if jenis == 2:
+        return teks[:i] + teks[i + 1:]
+    if jenis == 3:
+        return teks[:i - 1] + teks[i] + teks[i - 1] + teks[i + 1:]
+    if jenis == 4:
+        return teks[:i] + teks[i] + teks[i:]
+    return " " + teks.replace(" ", "  ")
+
+
+def _status_caring(rng, n):
+    status = _pilih(rng, STATUS_CARING, n)
+    noise = np.flatnonzero(rng.random(n) < PORSI_NOISE)
+    for i in noise:
+        status[i] = _acak_ejaan(rng, status[i])
+    return status
+
+
+def buat_data(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "NO": np.arange(1, n + 1),
+        "NAMA": [f"PELANGGAN {i}" for i in range(n)],
+        "NO HP": [f"08{v:010d}" for v in rng.integers(0, 10**10, n)],
+        "ALAMAT": _pilih(rng, {"JL. SUDIRMAN": 1, "JL. AHMAD YANI": 1, "JL. DIPONEGORO": 1}, n),
+        "NO INET": rng.integers(10**11, 10**12, n),
+        "DATEL": _pilih(rng, DATEL, n),
+        "HABIT": _pilih(rng, HABIT, n),
+        "STATUS PAID": _pilih(rng, STATUS_PAID, n),
+        "STATUS CARING 1": _status_caring(rng, n),
+        "STATUS CARING 2": _status_caring(rng, n),
+        "ADDITIONAL INFO": _pilih(rng, dict.fromkeys(INFO, 1), n),
+    })
+
+
+def tulis_workbook(df, path):
+    # openpyxl write-only: memori tetap kecil walau 1 juta baris
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(NAMA_SHEET)
+    ws.append(list(df.columns))
+    for baris in df.itertuples(index=False, name=None):
+        ws.append([None if isinstance(v, float) and np.isnan(v) else v for v in baris])
+    wb.save(path)
+
+
+def buat_data_bersih(n=40):
+    # Status tanpa salah ketik + beberapa sel STATUS CARING 2 kosong (kasus regresi Categorical)
+    # dan dua baris terakhir tanpa DATEL (harus diabaikan ringkasan)
+    status = ["RNA", "RESPONS OK", "SALAH SAMBUNG"]
+    return pd.DataFrame({
+        "NO": np.arange(1, n + 1),
+        "DATEL": [None if i >= n - 2 else ["PADANG", "JAMBI"][i % 2] for i in range(n)],
+        "HABIT": "RAJIN",
+        "STATUS PAID": [["PAID", "UNPAID"][i % 2] for i in range(n)],
+        "STATUS CARING 1": [status[i % 3] for i in range(n)],
+        "STATUS CARING 2": [None if i % 7 == 0 else status[(i + 1) % 3] for i in range(n)],
+    })
+
+
+def workbook_sintetis(n, folder, seed=0):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"caring_{n}_{seed}.xlsx")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        tulis_workbook(buat_data(n, seed), tmp_path)
+        os.replace(tmp_path, path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# =========================
+# TAHAP YANG DIUKUR
+# =========================
+def baca_mentah(file_bytes):
+    # Parse Excel saja (tanpa pembersihan), setara pd.read_excel
+    import openpyxl
+
+    wb = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        baris = wb[NAMA_SHEET].iter_rows(values_only=True)
+        header = next(baris)
+        return pd.DataFrame(list(baris), columns=list(header))
+    finally:
+        wb.close()
+
+
+def filter_sidebar(kubus):
+    # Urutan kerja sidebar: opsi tiap filter dihitung dari filter sebelumnya, lalu potong kubus
+    indeks = kubus.indeks
+    datel = sorted(indeks.nilai_ada("DATEL"))
+    syarat = buat_syarat(datel_multi=datel[:3])
+    indeks.nilai_ada("HABIT", indeks.mask_syarat(syarat))
+    syarat = buat_syarat(datel_multi=datel[:3], paid="UNPAID")
+    mask = indeks.mask_syarat(syarat)
+    opsi = sorted(set(indeks.nilai_ada("STATUS CARING 1", mask) + indeks.nilai_ada("STATUS CARING 2", mask)) - {""})
+    syarat = buat_syarat(datel_multi=datel[:3], paid="UNPAID", hasil_caring="Semua", jenis_caring=opsi[0])
+    return kubus.potong(indeks.mask_syarat(syarat))
+
+
+def _reset_memo():
+    normalisasi._memo_status.clear()
+    normalisasi._memo_kategori.clear()
+
+
+def ringkasan_ai(df, file_hash, sel):
+    ringkasan = hitung_ringkasan(sel)
+    summary = ringkasan.teks_ai()
+    digest = digest_untuk(df, file_hash, NAMA_SHEET, [], None)
+    if digest:
+        summary = f"{summary}\n{digest}\n"
+    klien = KlienAI(model=ModelStub(), cache=CacheJawaban())
+    return klien.analisis(summary)
+
+
+def ukur(fungsi, ulang, persiapan=None):
+    waktu, hasil = [], None
+    for _ in range(ulang):
+        if persiapan:
+            persiapan()
+        gc.collect()
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        waktu.append(time.perf_counter() - mulai)
+    return hasil, {"detik": statistics.median(waktu), "min": min(waktu), "ulang": waktu}
+
+
+def jalankan(n, folder, ulang, seed=0):
+    mulai = time.perf_counter()
+    file_bytes = workbook_sintetis(n, folder, seed)
+    file_hash = hash_konten(file_bytes)
+    tahap = {}
+    print(f"[{n} baris] workbook siap ({time.perf_counter() - mulai:.1f} detik)", file=sys.stderr)
+
+    # Parse Excel diukur sekali saja untuk ukuran besar (mahal)
+    ulang_baca = 1 if n >= 500_000 else ulang
+    mentah, tahap["parse_excel"] = ukur(lambda: baca_mentah(file_bytes), ulang_baca)
+    _, tahap["pembersihan"] = ukur(lambda m=mentah: bersihkan_sheet(m.copy()), ulang)
+    del mentah
+    df, tahap["baca_streaming"] = ukur(lambda: baca_sheet_streaming(file_bytes, NAMA_SHEET), ulang_baca)
+
+    # Pencocokan fuzzy diukur per baris sheet dengan memo kosong (kondisi sesi baru)
+    kolom = ["STATUS CARING 1", "STATUS CARING 2"]
+    _, tahap["normalisasi_status"] = ukur(
+        lambda: [normalisasi.normalisasi_kolom(df[k]) for k in kolom], ulang, _reset_memo
+    )
+    _, tahap["kategori_keywords"] = ukur(
+        lambda: [normalisasi.kategori_kolom(df[k]) for k in kolom], ulang, _reset_memo
+    )
+
+    _, tahap["indeks_baris"] = ukur(lambda: IndeksFilter(df), ulang)
+    kubus, tahap["kubus"] = ukur(lambda: KubusHitung(df), ulang, _reset_memo)
+    sel, tahap["filter_sidebar"] = ukur(lambda: filter_sidebar(kubus), ulang)
+
+    def kosong_per_datel():
+        ringkasan = hitung_ringkasan(kubus.cube)
+        return ringkasan.tabel_kosong(kolom_kosong("Semua"))
+    _, tahap["jumlah_kosong_per_datel"] = ukur(kosong_per_datel, ulang)
+    _, tahap["ringkasan_ai_stub"] = ukur(lambda: ringkasan_ai(df, file_hash, kubus.cube), ulang)
+
+    return {
+        "baris": n,
+        "sel_kubus": len(kubus.cube),
+        "baris_terfilter": int(sel["JUMLAH"].sum()),
+        "status_unik": int(df["STATUS CARING 1"].nunique()),
+        "tahap": tahap,
+    }
+
+
+# =========================
+# CEK REGRESI KEBENARAN
+# =========================
+def cek_sheet_bersih():
+    # Sheet kecil yang status-nya bersih harus lolos pipeline penuh: map pada kolom Categorical
+    # menghasilkan Categorical, dan sel kosong dulu membuat fillna gagal saat upload.
+    # Juga potongan streaming yang tipe kategorinya berbeda (union_categoricals dulu gagal)
+    from ekspor import potongan_terfilter
+
+    buffer = io.BytesIO()
+    tulis_workbook(buat_data_bersih(), buffer)
+    df = baca_sheet_streaming(buffer.getvalue(), NAMA_SHEET)
+
+    # Potongan streaming dengan tipe kategori berbeda: HABIT kosong semua di potongan akhir,
+    # angka vs teks di potongan lain. Hasil gabungan harus sama dengan baca satu potongan
+    data = buat_data_bersih()
+    data["HABIT"] = data["HABIT"].astype(object)
+    data.loc[20:, "HABIT"] = None
+    data.loc[:4, "HABIT"] = 1
+    buffer = io.BytesIO()
+    tulis_workbook(data, buffer)
+    utuh = baca_sheet_streaming(buffer.getvalue(), NAMA_SHEET)
+    potongan = baca_sheet_streaming(buffer.getvalue(), NAMA_SHEET, ukuran_potongan=5)
+    if utuh["HABIT"].astype(object).fillna("").tolist() != potongan["HABIT"].astype(object).fillna("").tolist():
+        raise RuntimeError("Baca streaming per potongan mengubah isi HABIT")
+    kubus = KubusHitung(df)
+    kosong = int(df["STATUS CARING 2"].isna().sum())
+    hasil = kubus.cube.groupby("NORMAL STATUS CARING 2", observed=True)["JUMLAH"].sum()
+    if int(kubus.cube["JUMLAH"].sum()) != len(df) or int(hasil.get("", 0)) != kosong:
+        raise RuntimeError(f"Kubus sheet bersih salah hitung: {hasil.to_dict()}")
+    ekspor = pd.concat(potongan_terfilter(df, np.ones(len(df), dtype=bool)))
+    if (ekspor["KATEGORI CARING 2"] == "NOT YET").sum() != kosong:
+        raise RuntimeError("Ekspor sheet bersih salah mengkategorikan sel kosong")
+    datel_kosong = int(df["DATEL"].isna().sum())
+    if hitung_ringkasan(kubus.cube).total_valid != len(df) - datel_kosong:
+        raise RuntimeError("Ringkasan sheet bersih ikut menghitung baris tanpa DATEL")
+
+
+# =========================
+# PERBANDINGAN DENGAN HASIL LAMA
+# =========================
+def bandingkan(hasil, acuan):
+    # Tahap yang lebih lambat dari acuan * AMBANG_REGRESI: [(baris, tahap, detik_lama, detik_baru)]
+    lama = {(h["baris"], t): v["detik"] for h in acuan["hasil"] for t, v in h["tahap"].items()}
+    regresi = []
+    for h in hasil["hasil"]:
+        for t, v in h["tahap"].items():
+            detik_lama = lama.get((h["baris"], t))
+            if detik_lama and v["detik"] > detik_lama * AMBANG_REGRESI:
+                regresi.append((h["baris"], t, detik_lama, v["detik"]))
+    return regresi
+
+
+def versi_git():
+    import subprocess
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per tahap pipeline caring")
+    parser.add_argument("--baris", type=int, nargs="+", default=UKURAN_DEFAULT)
+    parser.add_argument("--ulang", type=int, default=3, help="Pengulangan per tahap (median dilaporkan)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--folder-data", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bench_data"))
+    parser.add_argument("-o", "--output", default=None, help="File JSON hasil (default: stdout)")
+    parser.add_argument("--banding", default=None, help="File JSON hasil sebelumnya untuk deteksi regresi")
+    parser.add_argument("--cek-saja", action="store_true", help="Hanya jalankan cek regresi kebenaran")
+    args = parser.parse_args(argv)
+
+    cek_sheet_bersih()
+    if args.cek_saja:
+        print("Cek regresi OK", file=sys.stderr)
+        return 0
+
+    hasil = {
+        "waktu": datetime.now().isoformat(timespec="seconds"),
+        "git": versi_git(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu": os.cpu_count(),
+        "hasil": [jalankan(n, args.folder_data, max(1, args.ulang), args.seed) for n in args.baris],
+    }
+
+    teks = json.dumps(hasil, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(teks)
+    else:
+        print(teks)
+
+    for h in hasil["hasil"]:
+        baris = ", ".join(f"{t} {v['detik']:.3f}s" for t, v in h["tahap"].items())
+        print(f"[{h['baris']} baris] {baris}", file=sys.stderr)
+
+    if args.banding:
+        with open(args.banding, encoding="utf-8") as f:
+            regresi = bandingkan(hasil, json.load(f))
+        for n, t, lama, baru in regresi:
+            print(f"REGRESI [{n} baris] {t}: {lama:.3f}s -> {baru:.3f}s", file=sys.stderr)
+        return 1 if regresi else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+
+
+# =========================
+# CACHE LRU IN-MEMORY
+# =========================
+class CacheLRU:
+    # Dibatasi jumlah entri (maks) dan/atau total ukuran (maks_byte, ukuran tiap nilai dari fungsi ukuran).
+    # Entri paling lama tidak dipakai dibuang duluan, entri yang baru masuk selalu disimpan
+    def __init__(self, maks=None, maks_byte=None, ukuran=None):
+        self.maks = maks
+        self.maks_byte = maks_byte
+        self.ukuran = ukuran
+        self.total_byte = 0
+        self._data = OrderedDict()   # kunci -> (nilai, ukuran_byte)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def ambil(self, kunci):
+        with self._lock:
+            item = self._data.get(kunci)
+            if item is None:
+                return None
+            self._data.move_to_end(kunci)
+            return item[0]
+
+    def simpan(self, kunci, nilai):
+        ukuran = self.ukuran(nilai) if self.ukuran else 0
+        with self._lock:
+            if kunci in self._data:
+                self.total_byte -= self._data.pop(kunci)[1]
+            self._data[kunci] = (nilai, ukuran)
+            self.total_byte += ukuran
+            while len(self._data) > 1 and (
+                (self.maks is not None and len(self._data) > self.maks)
+                or (self.maks_byte is not None and self.total_byte > self.maks_byte)
+            ):
+                _, (_, ukuran_lama) = self._data.popitem(last=False)
+                self.total_byte -= ukuran_lama
+        return nilai
+
+    def ambil_atau_buat(self, kunci, buat):
+        # buat() dijalankan di luar lock supaya pembuatan yang lama tidak menahan thread lain
+        nilai = self.ambil(kunci)
+        if nilai is None:
+            nilai = self.simpan(kunci, buat())
+        return nilai
+
+    def kosongkan(self):
+        with self._lock:
+            self._data.clear()
+            self.total_byte = 0
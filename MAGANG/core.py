@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+
+from digest_info import KOLOM_INFO, buat_digest, mask_status_digest
+from filter_index import indeks_untuk
+from ingest import daftar_sheet, hash_konten, muat_sheet
+from kubus import (hitung_ringkasan, jumlah_per, kolom_caring, kubus_untuk, nama_kolom_kategori,
+                   nama_kolom_normal, nama_kosong)
+
+# =========================
+# PIPELINE INTI (TANPA STREAMLIT)
+# =========================
+# load -> clean -> filter -> normalisasi/kategori -> agregasi, dipakai oleh app.py dan batch.py
+
+PREFIX_SHEET = "SUMBAR JAMBI"
+
+HASIL_KE_KOLOM = {
+    "Status Caring 1": ["STATUS CARING 1"],
+    "Status Caring 2": ["STATUS CARING 2"],
+    "Status Caring": ["STATUS CARING"],
+    "Semua": ["STATUS CARING 1", "STATUS CARING 2"],
+}
+
+
+def sheet_valid(file_bytes, file_hash=None):
+    # Ambil hanya sheet yang diawali 'SUMBAR JAMBI'
+    return [s for s in daftar_sheet(file_bytes, file_hash) if s.upper().startswith(PREFIX_SHEET)]
+
+
+def pilihan_hasil_caring(kolom):
+    if "STATUS CARING 1" in kolom and "STATUS CARING 2" in kolom:
+        return ["Semua", "Status Caring 1", "Status Caring 2"]
+    if "STATUS CARING" in kolom:
+        return ["Status Caring"]
+    return []
+
+
+def kolom_caring_aktif(hasil_caring, kolom):
+    # Kolom caring tunggal yang sedang dipilih, None untuk "Semua"
+    if hasil_caring == "Semua":
+        return None
+    daftar = HASIL_KE_KOLOM.get(hasil_caring, [])
+    return daftar[0] if daftar and daftar[0] in kolom else None
+
+
+def klausa_caring(hasil_caring, jenis_caring):
+    return [(kolom, [jenis_caring]) for kolom in HASIL_KE_KOLOM[hasil_caring]]
+
+
+def buat_syarat(datel=None, datel_multi=None, habit=None, paid=None, hasil_caring="Semua", jenis_caring=None):
+    # Versi non-interaktif dari filter sidebar (None = semua)
+    syarat = []
+    if datel:
+        syarat.append([("DATEL", [datel])])
+    if datel_multi:
+        syarat.append([("DATEL", list(datel_multi))])
+    if habit is not None:
+        syarat.append([("HABIT", [habit])])
+    if paid:
+        syarat.append([("STATUS PAID", [paid])])
+    if jenis_caring:
+        syarat.append(klausa_caring(hasil_caring, jenis_caring))
+    return syarat
+
+
+def kolom_kosong(hasil_caring):
+    # Kolom yang ditampilkan di ringkasan data kosong
+    if hasil_caring in ("Status Caring 1", "Status Caring 2"):
+        return HASIL_KE_KOLOM[hasil_caring]
+    return ["STATUS CARING 1", "STATUS CARING 2"]
+
+
+def daftar_chart(sel, hasil_caring, tampilan):
+    # Pie chart distribusi sesuai pilihan: [(jumlah, label kolom, judul, key), ...]
+    chart = []
+    if tampilan == "Status Asli":
+        if hasil_caring == "Status Caring 1":
+            chart.append(("STATUS CARING 1", "STATUS CARING 1", "Distribusi Status Caring 1", "asli_status_1"))
+        elif hasil_caring == "Status Caring 2":
+            chart.append(("STATUS CARING 2", "STATUS CARING 2", "Distribusi Status Caring 2", "asli_status_2"))
+        elif hasil_caring == "Status Caring":
+            chart.append(("STATUS CARING", "STATUS CARING", "Distribusi Status Caring", "asli_status_total"))
+        else:  # Semua
+            chart.append(("STATUS CARING 1", "STATUS CARING 1", "Distribusi Status Caring 1", "asli_status_all_1"))
+            chart.append(("STATUS CARING 2", "STATUS CARING 2", "Distribusi Status Caring 2", "asli_status_all_2"))
+        sumber = nama_kolom_normal
+    else:
+        if hasil_caring == "Status Caring 1":
+            chart.append(("STATUS CARING 1", "KATEGORI CARING", "Distribusi Kategori Caring 1", "kategori_status_1"))
+        elif hasil_caring == "Status Caring 2":
+            chart.append(("STATUS CARING 2", "KATEGORI CARING", "Distribusi Kategori Caring 2", "kategori_status_2"))
+        elif hasil_caring == "Status Caring":
+            chart.append(("STATUS CARING", "KATEGORI CARING", "Distribusi Kategori Caring", "kategori_status_total"))
+        else:  # Semua
+            chart.append(("STATUS CARING 1", "KATEGORI CARING 1", "Distribusi Kategori Caring 1", "kategori_all_1"))
+            chart.append(("STATUS CARING 2", "KATEGORI CARING 2", "Distribusi Kategori Caring 2", "kategori_all_2"))
+        sumber = nama_kolom_kategori
+
+    return [
+        (jumlah_per(sel, sumber(kolom)), label, judul, key)
+        for kolom, label, judul, key in chart
+        if kolom in sel.columns
+    ]
+
+
+# =========================
+# FIGURE PLOTLY
+# =========================
+def chart_pie(jumlah, kolom, judul):
+    import plotly.express as px
+
+    count_df = jumlah.sort_values(ascending=False).reset_index()
+    count_df.columns = [kolom, "JUMLAH"]
+    fig = px.pie(count_df, names=kolom, values="JUMLAH", title=judul)
+    fig.update_traces(textinfo="percent+label", textfont_size=8)
+    return fig
+
+
+def chart_kosong(tabel, daftar_kolom):
+    import plotly.express as px
+
+    nama = [nama_kosong(kolom) for kolom in daftar_kolom]
+    if len(nama) == 1:
+        nomor = daftar_kolom[0].replace("STATUS CARING", "").strip()
+        fig = px.bar(tabel, x="DATEL", y=nama[0],
+                     title=f"Distribusi Data Kosong Status Caring {nomor} per DATEL",
+                     text=nama[0])
+        fig.update_traces(textposition="outside")
+        return fig
+
+    fig = px.bar(
+        tabel,
+        x="DATEL",
+        y=nama,
+        title="Distribusi Data Kosong Status Caring 1 & 2 per DATEL",
+        barmode="stack"
+    )
+    fig.update_traces(texttemplate='%{y}', textposition='outside')
+    return fig
+
+
+# =========================
+# PROSES SATU SHEET
+# =========================
+@dataclass
+class HasilSheet:
+    sheet_name: str
+    hasil_caring: str
+    syarat: list
+    df: object
+    kubus: object
+    sel: object
+    ringkasan: object
+    caring_col: object
+
+
+def proses_sheet(file_bytes, sheet_name, file_hash=None, hasil_caring=None, **filter_sheet):
+    # filter_sheet: argumen buat_syarat (datel, datel_multi, habit, paid, jenis_caring)
+    file_hash = file_hash or hash_konten(file_bytes)
+    df = muat_sheet(file_bytes, sheet_name, file_hash)
+    if "DATEL" not in df.columns:
+        raise ValueError(f"Kolom 'DATEL' tidak ditemukan di sheet {sheet_name}.")
+    pilihan = pilihan_hasil_caring(df.columns)
+    if not pilihan:
+        raise ValueError(f"Tidak ada kolom STATUS CARING yang valid di sheet {sheet_name}.")
+    if hasil_caring is None:
+        hasil_caring = pilihan[0]
+    elif hasil_caring not in pilihan:
+        raise ValueError(f"Hasil caring '{hasil_caring}' tidak tersedia di sheet {sheet_name}.")
+
+    syarat = buat_syarat(hasil_caring=hasil_caring, **filter_sheet)
+    kubus = kubus_untuk(file_hash, sheet_name, df)
+    sel = kubus.potong(kubus.indeks.mask_syarat(syarat))
+    caring_col = kolom_caring_aktif(hasil_caring, sel.columns)
+    return HasilSheet(sheet_name, hasil_caring, syarat, df, kubus, sel,
+                      hitung_ringkasan(sel, caring_col), caring_col)
+
+
+def digest_untuk(df, file_hash, sheet_name, syarat, caring_col, budget_token=None):
+    # Digest ADDITIONAL INFO dari baris yang lolos filter (mask baris dibangun ulang dari syarat)
+    if KOLOM_INFO not in df.columns:
+        return ""
+    kolom_digest = [caring_col] if caring_col else [cc for cc in kolom_caring if cc in df.columns]
+    indeks_baris = indeks_untuk(file_hash, sheet_name, df)
+    # DATEL kosong (NaN maupun "") diabaikan, sama seperti ringkasan
+    datel_terisi = [d for d in indeks_baris.nilai_ada("DATEL") if d != ""]
+    mask_baris = (
+        indeks_baris.mask_syarat(syarat)
+        & indeks_baris.mask_isin("DATEL", datel_terisi)
+        & mask_status_digest(indeks_baris, kolom_digest)
+    )
+    return buat_digest(df.loc[mask_baris, ["DATEL", KOLOM_INFO] + kolom_digest], kolom_digest, budget_token)
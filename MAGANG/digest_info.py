@@ -0,0 +1,144 @@
+import os
+import re
+
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from normalisasi import normalisasi_kolom
+
+# =========================
+# KONFIGURASI DIGEST
+# =========================
+KOLOM_INFO = "ADDITIONAL INFO"
+STATUS_DIGEST = ["SALAH SAMBUNG", "COMPLAINT LAYANAN"]
+
+# Perkiraan kasar: 1 token ~ 4 karakter teks Indonesia/Inggris
+BUDGET_TOKEN = int(os.environ.get("CARING_DIGEST_TOKEN", "600"))
+KARAKTER_PER_TOKEN = 4
+# Skor token_set_ratio minimal supaya dua catatan dianggap satu kelompok
+AMBANG_MIRIP = 80
+# Batas teks unik yang dikelompokkan per status (sisanya masuk hitungan "lainnya")
+MAKS_TEKS_UNIK = 5000
+MAKS_KARAKTER_SAMPEL = 160
+MAKS_DATEL_PER_KELOMPOK = 3
+
+_NILAI_KOSONG = {"", "NAN", "NONE", "NULL", "-"}
+
+
+def _rapikan(teks):
+    return re.sub(r"\s+", " ", str(teks)).strip()
+
+
+def _perkiraan_token(teks):
+    return len(teks) // KARAKTER_PER_TOKEN + 1
+
+
+# =========================
+# PILIH BARIS
+# =========================
+def mask_status_digest(indeks, daftar_kolom):
+    # Baris yang status caring-nya (setelah normalisasi) SALAH SAMBUNG / COMPLAINT LAYANAN,
+    # dihitung dari kategori kolom lalu digabung lewat mask yang sudah ada di indeks
+    mask = indeks.kosong()
+    for kolom in daftar_kolom:
+        if kolom not in indeks.kategori:
+            continue
+        kategori = pd.Series(indeks.kategori[kolom], dtype=object)
+        cocok = kategori[normalisasi_kolom(kategori).isin(STATUS_DIGEST)]
+        mask |= indeks.mask_isin(kolom, cocok.tolist())
+    return mask
+
+
+# =========================
+# PENGELOMPOKAN
+# =========================
+def _kelompokkan(teks_unik):
+    # Greedy leader clustering: teks paling sering jadi wakil, teks lain ikut wakil
+    # yang paling mirip (kalau skornya di atas ambang)
+    wakil, wakil_kecil, anggota = [], [], []
+    for teks in teks_unik:
+        cocok = None
+        if wakil:
+            cocok = process.extractOne(
+                teks.lower(), wakil_kecil, scorer=fuzz.token_set_ratio, score_cutoff=AMBANG_MIRIP
+            )
+        if cocok:
+            anggota[cocok[2]].append(teks)
+        else:
+            wakil.append(teks)
+            wakil_kecil.append(teks.lower())
+            anggota.append([teks])
+    return wakil, anggota
+
+
+def kelompok_per_status(df, daftar_kolom):
+    # Hasil: {status: [(wakil, total, {DATEL: jumlah}), ...]} urut dari kelompok terbesar
+    if KOLOM_INFO not in df.columns or df.empty:
+        return {}
+
+    info = df[KOLOM_INFO].map(_rapikan, na_action="ignore")
+    hasil = {}
+    for status in STATUS_DIGEST:
+        cocok = pd.Series(False, index=df.index)
+        for kolom in daftar_kolom:
+            if kolom in df.columns:
+                cocok |= normalisasi_kolom(df[kolom]).eq(status)
+        teks = info[cocok & info.notna()]
+        teks = teks[~teks.str.upper().isin(_NILAI_KOSONG)]
+        if teks.empty:
+            continue
+
+        # Deduplikasi dulu: satu teks unik dihitung sekali per DATEL
+        hitung = (
+            pd.DataFrame({"TEKS": teks, "DATEL": df.loc[teks.index, "DATEL"].astype(str)})
+              .groupby(["TEKS", "DATEL"]).size()
+        )
+        per_teks = hitung.groupby(level="TEKS").sum().sort_values(ascending=False)
+        teks_unik = per_teks.index[:MAKS_TEKS_UNIK].tolist()
+
+        wakil, anggota = _kelompokkan(teks_unik)
+        kelompok = []
+        for w, daftar in zip(wakil, anggota):
+            per_datel = hitung.loc[daftar].groupby(level="DATEL").sum().sort_values(ascending=False)
+            kelompok.append((w, int(per_datel.sum()), per_datel.to_dict()))
+        lainnya = int(per_teks.iloc[MAKS_TEKS_UNIK:].sum())
+        if lainnya:
+            kelompok.append(("(catatan lain yang tidak dikelompokkan)", lainnya, {}))
+        hasil[status] = sorted(kelompok, key=lambda k: k[1], reverse=True)
+    return hasil
+
+
+# =========================
+# DIGEST UNTUK PROMPT
+# =========================
+def buat_digest(df, daftar_kolom, budget_token=None):
+    budget_token = BUDGET_TOKEN if budget_token is None else budget_token
+    kelompok = kelompok_per_status(df, daftar_kolom)
+    if not kelompok:
+        return ""
+
+    judul = "Ringkasan ADDITIONAL INFO (catatan mirip dikelompokkan, jumlah per DATEL):"
+    sisa = budget_token - _perkiraan_token(judul)
+    bagian = {}
+    for status, daftar in kelompok.items():
+        total = sum(k[1] for k in daftar)
+        kepala = f"[{status}] {total} catatan, {len(daftar)} kelompok"
+        bagian[status] = [kepala]
+        sisa -= _perkiraan_token(kepala)
+
+    # Sampel diambil bergiliran antar status, kelompok terbesar dulu, sampai budget habis
+    for urutan in range(max(len(d) for d in kelompok.values())):
+        for status, daftar in kelompok.items():
+            if urutan >= len(daftar):
+                continue
+            wakil, total, per_datel = daftar[urutan]
+            sampel = wakil if len(wakil) <= MAKS_KARAKTER_SAMPEL else wakil[:MAKS_KARAKTER_SAMPEL - 3] + "..."
+            datel = ", ".join(f"{d} {n}" for d, n in list(per_datel.items())[:MAKS_DATEL_PER_KELOMPOK])
+            baris = f'- "{sampel}" ({total}x' + (f"; {datel})" if datel else ")")
+            biaya = _perkiraan_token(baris)
+            if biaya > sisa:
+                continue
+            bagian[status].append(baris)
+            sisa -= biaya
+
+    return "\n".join([judul] + [baris for status in kelompok for baris in bagian[status]])
@@ -0,0 +1,150 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ingest import kolom_privasi
+from kubus import kolom_caring, nama_kolom_kategori, nama_kolom_normal
+from normalisasi import kategori_kolom, normalisasi_kolom
+
+# =========================
+# KONFIGURASI EKSPOR
+# =========================
+# Baris terfilter ditulis per potongan supaya memori tetap datar berapa pun ukuran sheet
+UKURAN_POTONGAN_EKSPOR = int(os.environ.get("CARING_EKSPOR_ROWS", "50000"))
+# Batas baris data per worksheet Excel (1.048.576 dikurangi header)
+MAKS_BARIS_XLSX = 1_048_575
+
+FORMAT_EKSPOR = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+# =========================
+# POTONGAN BARIS TERFILTER
+# =========================
+def potongan_terfilter(df, mask, ukuran_potongan=None):
+    # Baris diambil langsung dari mask filter per potongan, lalu ditambah status ternormalisasi
+    # dan kategori caring (memo normalisasi membuat tiap potongan cukup lookup)
+    ukuran_potongan = ukuran_potongan or UKURAN_POTONGAN_EKSPOR
+    kolom = [k for k in df.columns if k not in kolom_privasi]
+    posisi = np.flatnonzero(mask)
+    for mulai in range(0, len(posisi), ukuran_potongan):
+        potongan = df.iloc[posisi[mulai:mulai + ukuran_potongan]][kolom]
+        tambahan = {}
+        for k in kolom_caring:
+            if k in potongan.columns:
+                tambahan[nama_kolom_normal(k)] = normalisasi_kolom(potongan[k])
+                tambahan[nama_kolom_kategori(k)] = kategori_kolom(potongan[k])
+        yield potongan.assign(**tambahan)
+
+
+def _kolom_ekspor(df):
+    kolom = [k for k in df.columns if k not in kolom_privasi]
+    for k in kolom_caring:
+        if k in df.columns:
+            kolom += [nama_kolom_normal(k), nama_kolom_kategori(k)]
+    return kolom
+
+
+# =========================
+# PENULIS PER FORMAT
+# =========================
+def _tulis_csv(potongan_iter, kolom, tujuan):
+    # Header sekali, lalu tiap potongan ditambahkan; utf-8-sig supaya teks terbaca benar di Excel
+    tujuan.write(("\ufeff" + pd.DataFrame(columns=kolom).to_csv(index=False)).encode("utf-8"))
+    for potongan in potongan_iter:
+        tujuan.write(potongan.to_csv(index=False, header=False).encode("utf-8"))
+
+
+def _tulis_parquet(potongan_iter, kolom, tujuan):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, schema = None, None
+    try:
+        for potongan in potongan_iter:
+            if writer is None:
+                # Kolom teks dipaksa string supaya potongan yang isinya kosong semua tetap cocok skemanya
+                schema = pa.Schema.from_pandas(potongan, preserve_index=False)
+                for i, field in enumerate(schema):
+                    if potongan[field.name].dtype == object or pa.types.is_null(field.type):
+                        schema = schema.set(i, pa.field(field.name, pa.string()))
+                writer = pq.ParquetWriter(tujuan, schema)
+            writer.write_table(pa.Table.from_pandas(potongan, schema=schema, preserve_index=False))
+        if writer is None:
+            pq.write_table(pa.table({k: pa.array([], pa.string()) for k in kolom}), tujuan)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _nilai_xlsx(potongan):
+    # Kolom per kolom ke tipe Python biasa (kategori -> teks, NaN/NaT -> sel kosong)
+    kolom = []
+    for k in potongan.columns:
+        nilai = potongan[k].astype(object)
+        kolom.append(nilai.where(nilai.notna(), None).tolist())
+    return zip(*kolom)
+
+
+def _tulis_xlsx(potongan_iter, kolom, tujuan):
+    # openpyxl write-only: baris langsung di-stream ke file, pindah ke sheet baru kalau melewati batas Excel
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws, nomor, terisi = None, 0, MAKS_BARIS_XLSX
+    for potongan in potongan_iter:
+        for baris in _nilai_xlsx(potongan):
+            if terisi >= MAKS_BARIS_XLSX:
+                nomor += 1
+                ws = wb.create_sheet("DATA" if nomor == 1 else f"DATA {nomor}")
+                ws.append(kolom)
+                terisi = 0
+            ws.append(baris)
+            terisi += 1
+    if ws is None:
+        wb.create_sheet("DATA").append(kolom)
+    wb.save(tujuan)
+
+
+_PENULIS = {"CSV": _tulis_csv, "Parquet": _tulis_parquet, "Excel": _tulis_xlsx}
+
+
+# =========================
+# API EKSPOR
+# =========================
+def tulis_ekspor(df, mask, format_ekspor, tujuan, ukuran_potongan=None):
+    # tujuan: path atau file biner yang bisa ditulis
+    if format_ekspor not in _PENULIS:
+        raise ValueError(f"Format ekspor tidak dikenal: {format_ekspor}")
+    kolom = _kolom_ekspor(df)
+    potongan_iter = potongan_terfilter(df, mask, ukuran_potongan)
+    if isinstance(tujuan, (str, os.PathLike)):
+        with open(tujuan, "wb") as f:
+            _PENULIS[format_ekspor](potongan_iter, kolom, f)
+    else:
+        _PENULIS[format_ekspor](potongan_iter, kolom, tujuan)
+
+
+def ekspor_ke_file_sementara(df, mask, format_ekspor, ukuran_potongan=None):
+    # Hasil ditulis ke file sementara di disk (bukan buffer memori) lalu dibuka ulang untuk dibaca
+    # (BufferedReader, bentuk file yang diterima st.download_button)
+    fd, path = tempfile.mkstemp(prefix="caring_ekspor_", suffix=f".{FORMAT_EKSPOR[format_ekspor][0]}")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            tulis_ekspor(df, mask, format_ekspor, f, ukuran_potongan)
+        return open(path, "rb")
+    finally:
+        try:
+            # POSIX: isi tetap bisa dibaca lewat handle yang terbuka, file hilang saat handle ditutup
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def nama_file_ekspor(sheet_name, format_ekspor):
+    return f"caring_{sheet_name.replace(' ', '_')}.{FORMAT_EKSPOR[format_ekspor][0]}"
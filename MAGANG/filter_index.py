@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from cache_lru import CacheLRU
+
+# Kolom yang dipakai filter sidebar
+kolom_filter = ["DATEL", "HABIT", "STATUS PAID", "STATUS CARING 1", "STATUS CARING 2", "STATUS CARING"]
+
+INDEKS_MAKS = 8
+
+_cache_indeks = CacheLRU(maks=INDEKS_MAKS)   # (hash, sheet) -> IndeksFilter
+
+
+# =========================
+# INDEKS KODE PER KOLOM
+# =========================
+class IndeksFilter:
+    # Dibangun sekali per sheet: kode integer per baris untuk setiap kolom filter.
+    # Mask (kolom, nilai) dihitung dari kode saat dibutuhkan, tidak disimpan per nilai,
+    # supaya memori indeks tetap sebanding jumlah baris, bukan baris x jumlah ejaan status.
+
+    def __init__(self, df):
+        self.n = len(df)
+        self.kategori = {}   # kolom -> array nilai kategori
+        self.kode = {}       # kolom -> kode integer per baris (-1 untuk kosong/NaN)
+        self.posisi = {}     # kolom -> {nilai: kode}
+
+        for kolom in kolom_filter:
+            if kolom not in df.columns:
+                continue
+            series = df[kolom]
+            cat = series.cat if isinstance(series.dtype, pd.CategoricalDtype) else pd.Categorical(series)
+            kategori = np.asarray(cat.categories, dtype=object)
+            self.kode[kolom] = np.asarray(cat.codes)
+            self.kategori[kolom] = kategori
+            self.posisi[kolom] = {nilai: i for i, nilai in enumerate(kategori)}
+
+    def semua(self):
+        return np.ones(self.n, dtype=bool)
+
+    def kosong(self):
+        return np.zeros(self.n, dtype=bool)
+
+    def mask(self, kolom, nilai):
+        i = self.posisi.get(kolom, {}).get(nilai)
+        return self.kode[kolom] == i if i is not None else self.kosong()
+
+    def mask_isin(self, kolom, daftar_nilai):
+        posisi = self.posisi.get(kolom, {})
+        kode = [posisi[nilai] for nilai in daftar_nilai if nilai in posisi]
+        if not kode:
+            return self.kosong()
+        if len(kode) == 1:
+            return self.kode[kolom] == kode[0]
+        return np.isin(self.kode[kolom], kode)
+
+    def mask_syarat(self, syarat):
+        # syarat: daftar klausa (di-AND), tiap klausa daftar (kolom, daftar_nilai) (di-OR)
+        mask = self.semua()
+        for klausa in syarat:
+            cocok = self.kosong()
+            for kolom, daftar_nilai in klausa:
+                cocok |= self.mask_isin(kolom, daftar_nilai)
+            mask &= cocok
+        return mask
+
+    def nilai_ada(self, kolom, mask=None):
+        # Nilai (non-kosong) yang masih muncul di baris terpilih, dihitung dari kode saja
+        if kolom not in self.kode:
+            return []
+        kode = self.kode[kolom] if mask is None else self.kode[kolom][mask]
+        jumlah = np.bincount(kode[kode >= 0], minlength=len(self.kategori[kolom]))
+        return self.kategori[kolom][jumlah > 0].tolist()
+
+
+def indeks_untuk(file_hash, sheet_name, df):
+    return _cache_indeks.ambil_atau_buat((file_hash, sheet_name), lambda: IndeksFilter(df))
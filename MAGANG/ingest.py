@@ -0,0 +1,317 @@
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from cache_lru import CacheLRU
+
+# =========================
+# KONFIGURASI CACHE
+# =========================
+# Naikkan versi ini setiap kali logika pembersihan berubah supaya cache lama tidak terpakai
+VERSI_CACHE = 4
+
+CACHE_DIR = os.environ.get(
+    "CARING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_caring")
+)
+# Batas memori cache in-memory (MB), sheet paling lama tidak dipakai dibuang duluan
+CACHE_MAKS_MB = float(os.environ.get("CARING_CACHE_MB", "512"))
+# Batas ukuran cache Parquet di disk (MB); file paling lama tidak dipakai (mtime) dihapus duluan.
+# Isinya baris pelanggan (tanpa kolom privasi), jadi jangan dibiarkan menumpuk tanpa batas
+CACHE_DISK_MAKS_MB = float(os.environ.get("CARING_CACHE_DISK_MB", "1024"))
+# Banyak baris Excel yang dirakit menjadi satu potongan DataFrame saat streaming
+UKURAN_POTONGAN = int(os.environ.get("CARING_CHUNK_ROWS", "50000"))
+
+# Teks sel yang dianggap kosong, sama dengan na_values bawaan pd.read_excel
+NILAI_NA = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+kolom_privasi = ["NAMA", "EMAIL", "NO HP", "NO. HP", "ALAMAT"]
+kolom_status = ["DATEL", "STATUS PAID", "STATUS CARING 1", "STATUS CARING 2", "STATUS CARING"]
+# Kolom dengan sedikit nilai unik disimpan sebagai Categorical (kode integer + kamus nilai)
+kolom_kategori = ["DATEL", "HABIT", "STATUS PAID", "STATUS CARING 1", "STATUS CARING 2", "STATUS CARING"]
+
+_cache_sheet = CacheLRU(   # (hash, sheet) -> df
+    maks_byte=CACHE_MAKS_MB * 1024 * 1024, ukuran=lambda df: int(df.memory_usage(deep=True).sum())
+)
+_cache_nama_sheet = {}         # hash -> daftar nama sheet
+
+
+def hash_konten(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+# =========================
+# PEMBERSIHAN SHEET
+# =========================
+def bersihkan_header(kolom):
+    return [str(col).strip().upper() for col in kolom]
+
+
+def _bersihkan_status(df):
+    # Bersihkan kolom DATEL, STATUS PAID dan STATUS CARING, lalu simpan sebagai kode integer
+    for col in kolom_status:
+        if col in df.columns:
+            nilai = df[col].where(df[col].notna(), np.nan)
+            df[col] = nilai.astype(str).str.strip().str.upper()
+    for col in kolom_kategori:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _bersihkan_campuran(df):
+    # Kolom campuran (angka + teks) dijadikan teks supaya bisa disimpan ke Parquet
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty"):
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def bersihkan_sheet(df):
+    df.columns = bersihkan_header(df.columns)
+    df = df.drop(columns=[col for col in kolom_privasi if col in df.columns], errors="ignore")
+    return _bersihkan_campuran(_bersihkan_status(df))
+
+
+# =========================
+# PEMBACA EXCEL STREAMING
+# =========================
+def _header_unik(header):
+    # Sama seperti pandas: header kosong -> "UNNAMED: i", header ganda -> "X.1", "X.2", ...
+    hasil, terpakai = [], {}
+    for i, nama in enumerate(header):
+        nama = f"UNNAMED: {i}" if nama == "" else nama
+        if nama in terpakai:
+            terpakai[nama] += 1
+            nama = f"{nama}.{terpakai[nama]}"
+        else:
+            terpakai[nama] = 0
+        hasil.append(nama)
+    return hasil
+
+
+def _gabung_potongan(potongan, kolom):
+    if not potongan:
+        return pd.DataFrame(columns=kolom)
+    if len(potongan) == 1:
+        return potongan[0]
+    data = {}
+    for col in kolom:
+        bagian = [p[col] for p in potongan]
+        if all(isinstance(b.dtype, pd.CategoricalDtype) for b in bagian):
+            if len({b.cat.categories.dtype for b in bagian}) == 1:
+                # Gabung kamus kategori antar potongan tanpa kembali ke string per baris
+                data[col] = pd.Series(union_categoricals(bagian, sort_categories=True, ignore_order=True), name=col)
+            else:
+                # Tipe kategori beda antar potongan (mis. HABIT kosong semua di satu potongan,
+                # atau angka vs teks): union_categoricals menolak, jadi gabung sebagai object
+                data[col] = pd.concat([b.astype(object) for b in bagian], ignore_index=True).astype("category")
+        else:
+            data[col] = pd.concat(bagian, ignore_index=True)
+    return pd.DataFrame(data, columns=kolom)
+
+
+def baca_sheet_streaming(file_bytes, sheet_name, ukuran_potongan=None):
+    # Baca sheet lewat openpyxl read_only: kolom privasi dilewati sebelum dimaterialisasi,
+    # baris dirakit per potongan berukuran tetap
+    import openpyxl
+
+    ukuran_potongan = ukuran_potongan or UKURAN_POTONGAN
+    wb = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        baris_iter = wb[sheet_name].iter_rows(values_only=True)
+        header = next(baris_iter, None)
+        if header is None:
+            return pd.DataFrame()
+        header = _header_unik(bersihkan_header("" if h is None else h for h in header))
+
+        pilih = [(i, nama) for i, nama in enumerate(header) if nama not in kolom_privasi]
+        idx = [i for i, _ in pilih]
+        kolom = [nama for _, nama in pilih]
+        lebar = len(header)
+
+        potongan, buffer, kosong_tertunda = [], [], []
+        for baris in baris_iter:
+            if len(baris) < lebar:
+                baris = tuple(baris) + (None,) * (lebar - len(baris))
+            # Teks seperti "NULL" / "N/A" jadi kosong, seperti na_values bawaan pd.read_excel
+            nilai = [None if type(v) is str and v in NILAI_NA else v for v in (baris[i] for i in idx)]
+            # Baris kosong di akhir sheet dibuang seperti pd.read_excel
+            if all(v is None for v in baris[:lebar]):
+                kosong_tertunda.append(nilai)
+                continue
+            if kosong_tertunda:
+                buffer.extend(kosong_tertunda)
+                kosong_tertunda = []
+            buffer.append(nilai)
+            if len(buffer) >= ukuran_potongan:
+                potongan.append(_bersihkan_status(pd.DataFrame(buffer, columns=kolom)))
+                buffer = []
+        if buffer:
+            potongan.append(_bersihkan_status(pd.DataFrame(buffer, columns=kolom)))
+    finally:
+        wb.close()
+
+    return _bersihkan_campuran(_gabung_potongan(potongan, kolom))
+
+
+# =========================
+# CACHE DI DISK (PARQUET)
+# =========================
+def _path_parquet(file_hash, sheet_name):
+    sheet_hash = hashlib.sha1(sheet_name.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"v{VERSI_CACHE}_{file_hash}_{sheet_hash}.parquet")
+
+
+def _baca_parquet(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+        # Tandai baru dipakai supaya tidak ikut terbuang saat pemangkasan cache disk
+        os.utime(path)
+        return df
+    except Exception:
+        # File rusak / pyarrow tidak ada -> anggap cache kosong
+        return None
+
+
+def _tulis_parquet(path, df):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        # Cache disk hanya optimasi, kegagalan tidak boleh menghentikan dashboard
+        return False
+    try:
+        _pangkas_disk(path)
+    except OSError:
+        pass
+    return True
+
+
+def _pangkas_disk(path_baru=None):
+    # Hapus file Parquet paling lama tidak dipakai sampai total di bawah batas (file yang baru ditulis tetap)
+    batas = CACHE_DISK_MAKS_MB * 1024 * 1024
+    daftar = []
+    with os.scandir(CACHE_DIR) as isi:
+        for entri in isi:
+            try:
+                if entri.is_file() and entri.name.endswith(".parquet"):
+                    info = entri.stat()
+                    daftar.append((info.st_mtime, info.st_size, entri.path))
+            except OSError:
+                # Bisa sudah dihapus proses lain (worker paralel) di tengah jalan
+                continue
+    total = sum(ukuran for _, ukuran, _ in daftar)
+    for _, ukuran, path in sorted(daftar):
+        if total <= batas:
+            break
+        if path == path_baru:
+            continue
+        try:
+            os.remove(path)
+            total -= ukuran
+        except OSError:
+            pass
+
+
+# =========================
+# API INGESTION
+# =========================
+def daftar_sheet(file_bytes, file_hash=None):
+    import openpyxl
+
+    file_hash = file_hash or hash_konten(file_bytes)
+    if file_hash not in _cache_nama_sheet:
+        wb = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True)
+        _cache_nama_sheet[file_hash] = wb.sheetnames
+        wb.close()
+    return _cache_nama_sheet[file_hash]
+
+
+def _dari_cache(kunci, path):
+    df = _cache_sheet.ambil(kunci)
+    if df is None:
+        df = _baca_parquet(path)
+        if df is not None:
+            _cache_sheet.simpan(kunci, df)
+    return df
+
+
+def muat_sheet(file_bytes, sheet_name, file_hash=None):
+    # Parse + bersihkan satu sheet sekali saja per isi file
+    file_hash = file_hash or hash_konten(file_bytes)
+    kunci = (file_hash, sheet_name)
+    path = _path_parquet(file_hash, sheet_name)
+
+    df = _dari_cache(kunci, path)
+    if df is None:
+        df = baca_sheet_streaming(file_bytes, sheet_name)
+        _tulis_parquet(path, df)
+        _cache_sheet.simpan(kunci, df)
+    return df
+
+
+def _muat_di_worker(file_bytes, sheet_name, path):
+    # Dijalankan di proses terpisah: hasil dikirim balik lewat file Parquet,
+    # DataFrame hanya di-pickle kalau cache disk tidak bisa ditulis
+    df = baca_sheet_streaming(file_bytes, sheet_name)
+    if _tulis_parquet(path, df):
+        return None
+    return df
+
+
+def muat_semua_sheet(file_bytes, sheet_names, file_hash=None, maks_worker=None):
+    # Sheet yang belum ada di cache di-parse paralel, satu proses per sheet
+    file_hash = file_hash or hash_konten(file_bytes)
+
+    hasil, belum = {}, []
+    for sheet_name in sheet_names:
+        kunci = (file_hash, sheet_name)
+        df = _dari_cache(kunci, _path_parquet(file_hash, sheet_name))
+        if df is None:
+            belum.append(sheet_name)
+        else:
+            hasil[sheet_name] = df
+
+    # Pool hanya dipakai kalau benar-benar ada >1 worker; dengan satu worker biaya spawn
+    # membuatnya lebih lambat dari parse serial di bawah
+    jumlah_worker = min(len(belum), maks_worker or os.cpu_count() or 1)
+    if jumlah_worker > 1:
+        try:
+            # "spawn" aman dipakai dari server Streamlit yang multi-thread
+            konteks = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=jumlah_worker, mp_context=konteks) as pool:
+                tugas = {
+                    sheet_name: pool.submit(
+                        _muat_di_worker, file_bytes, sheet_name,
+                        _path_parquet(file_hash, sheet_name),
+                    )
+                    for sheet_name in belum
+                }
+                for sheet_name, fut in tugas.items():
+                    df = fut.result()
+                    if df is None:
+                        df = _baca_parquet(_path_parquet(file_hash, sheet_name))
+                    if df is not None:
+                        _cache_sheet.simpan((file_hash, sheet_name), df)
+                        hasil[sheet_name] = df
+        except Exception:
+            # Pool gagal dibuat (mis. lingkungan tanpa fork/spawn) -> lanjut serial di bawah
+            pass
+
+    for sheet_name in sheet_names:
+        if sheet_name not in hasil:
+            hasil[sheet_name] = muat_sheet(file_bytes, sheet_name, file_hash)
+    return {sheet_name: hasil[sheet_name] for sheet_name in sheet_names}
@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+from cache_lru import CacheLRU
+from filter_index import IndeksFilter, kolom_filter
+from normalisasi import kategori_kolom, normalisasi_kolom
+
+kolom_caring = ["STATUS CARING 1", "STATUS CARING 2", "STATUS CARING"]
+NILAI_KOSONG = ["", "NAN", "NONE", "NULL", "-"]
+
+KUBUS_MAKS = 8
+
+_cache_kubus = CacheLRU(maks=KUBUS_MAKS)   # (hash, sheet) -> KubusHitung
+
+
+def nama_kolom_normal(kolom):
+    return f"NORMAL {kolom}"
+
+
+def nama_kolom_kategori(kolom):
+    return kolom.replace("STATUS", "KATEGORI")
+
+
+# =========================
+# KUBUS JUMLAH
+# =========================
+class KubusHitung:
+    # Satu baris kubus = satu kombinasi DATEL x HABIT x STATUS PAID x STATUS CARING,
+    # kolom JUMLAH berisi banyaknya baris sheet dengan kombinasi tersebut.
+    # Normalisasi status & kategori caring adalah fungsi dari status caring,
+    # jadi cukup dihitung per sel kubus, bukan per baris sheet.
+
+    def __init__(self, df):
+        self.dimensi = [kolom for kolom in kolom_filter if kolom in df.columns]
+        cube = (
+            df.groupby(self.dimensi, observed=True, dropna=False, sort=False)
+              .size()
+              .reset_index(name="JUMLAH")
+        )
+        for kolom in kolom_caring:
+            if kolom in cube.columns:
+                cube[nama_kolom_normal(kolom)] = normalisasi_kolom(cube[kolom])
+                cube[nama_kolom_kategori(kolom)] = kategori_kolom(cube[kolom])
+        self.cube = cube
+        # Filter sidebar dijalankan di atas sel kubus, bukan di atas baris sheet
+        self.indeks = IndeksFilter(cube)
+
+    def potong(self, mask):
+        return self.cube[mask]
+
+
+def kubus_untuk(file_hash, sheet_name, df):
+    return _cache_kubus.ambil_atau_buat((file_hash, sheet_name), lambda: KubusHitung(df))
+
+
+# =========================
+# QUERY DI ATAS POTONGAN KUBUS
+# =========================
+def jumlah_per(sel, kolom):
+    # Setara value_counts(sort=False) pada baris sheet, tanpa nilai berjumlah 0
+    hasil = sel.groupby(kolom, observed=True)["JUMLAH"].sum()
+    return hasil[hasil > 0]
+
+
+def modus(sel, kolom):
+    # Setara Series.mode()[0]: jumlah terbanyak, seri diambil nilai terkecil
+    jumlah = jumlah_per(sel, kolom)
+    if jumlah.empty:
+        return "-"
+    return sorted(jumlah.index[jumlah == jumlah.max()])[0]
+
+
+def datel_valid(datel):
+    # DATEL kosong (NaN maupun "") diabaikan di ringkasan, AI dan perbandingan sheet
+    return datel.notna() & (datel != "")
+
+
+def nama_kosong(kolom):
+    return kolom.replace("STATUS", "JUMLAH KOSONG")
+
+
+# =========================
+# RINGKASAN (SATU KALI AGREGASI)
+# =========================
+@dataclass
+class Ringkasan:
+    total_data: int
+    jumlah_datel: int
+    paid_rate: object          # float, atau None kalau tidak ada kolom STATUS PAID
+    top_caring: str
+    per_datel: pd.DataFrame    # DATEL valid -> JUMLAH, PAID, UNPAID, JUMLAH KOSONG ..., BLANK ...
+    total_valid: int
+    jumlah_datel_valid: int
+    paid_dist: object
+    caring_dist: object
+    unpaid_rank: object
+    kosong_count: object
+
+    def tabel_kosong(self, daftar_kolom):
+        # Jumlah kosong per DATEL untuk kolom caring terpilih, hanya DATEL yang punya data kosong
+        nama = [nama_kosong(kolom) for kolom in daftar_kolom]
+        if any(n not in self.per_datel.columns for n in nama):
+            return pd.DataFrame(columns=["DATEL"] + nama)
+        tabel = self.per_datel[nama]
+        tabel = tabel[(tabel > 0).any(axis=1)].astype(int)
+        tabel = tabel.sort_values(by=nama, ascending=False)
+        return tabel.rename_axis("DATEL").reset_index()
+
+    def teks_ai(self):
+        return f"""
+Total baris: {self.total_valid}
+Jumlah DATEL unik: {self.jumlah_datel_valid}
+Distribusi STATUS PAID: {self.paid_dist}
+Distribusi STATUS CARING (aktif/combined): {self.caring_dist}
+Top 5 DATEL unpaid (estimasi): {self.unpaid_rank}
+Jumlah data kosong di kolom caring aktif: {self.kosong_count}
+Status caring terbanyak (mode caring 1): {self.top_caring}
+"""
+
+
+def hitung_ringkasan(sel, caring_aktif=None):
+    # Semua angka per DATEL (total, paid, unpaid, kosong) dihitung dalam satu groupby
+    jumlah = sel["JUMLAH"]
+    bantu = pd.DataFrame({"DATEL": sel["DATEL"], "JUMLAH": jumlah})
+    ada_paid = "STATUS PAID" in sel.columns
+    if ada_paid:
+        bantu["PAID"] = jumlah.where(sel["STATUS PAID"] == "PAID", 0)
+        bantu["UNPAID"] = jumlah - bantu["PAID"]
+    for kolom in kolom_caring:
+        if kolom in sel.columns:
+            kosong = sel[kolom].isna() | sel[kolom].isin(NILAI_KOSONG)
+            blank = sel[kolom].isna() | (sel[kolom] == "")
+            bantu[nama_kosong(kolom)] = jumlah.where(kosong, 0)
+            bantu[f"BLANK {kolom}"] = jumlah.where(blank, 0)
+    per_datel = bantu.groupby("DATEL", observed=True, dropna=False).sum()
+
+    total_data = int(per_datel["JUMLAH"].sum())
+    if ada_paid:
+        paid_rate = per_datel["PAID"].sum() / total_data * 100 if total_data else float("nan")
+    else:
+        paid_rate = None
+
+    # Ringkasan kosong & AI mengabaikan DATEL kosong
+    valid = per_datel[datel_valid(per_datel.index)]
+    sel_valid = sel[datel_valid(sel["DATEL"])]
+
+    if ada_paid:
+        paid_dist = jumlah_per(sel_valid, "STATUS PAID").sort_values(ascending=False).to_dict()
+        unpaid = valid["UNPAID"]
+        unpaid_rank = unpaid[unpaid > 0].sort_values(ascending=False).head(5).to_dict()
+    else:
+        paid_dist = "-"
+        unpaid_rank = "-"
+
+    if caring_aktif:
+        caring_dist = jumlah_per(sel_valid, caring_aktif).sort_values(ascending=False).to_dict()
+        kosong_count = int(valid[f"BLANK {caring_aktif}"].sum())
+    else:
+        stacks = [jumlah_per(sel_valid, cc) for cc in kolom_caring if cc in sel.columns]
+        if stacks:
+            gabungan = pd.concat([j.rename(index=str) for j in stacks]).groupby(level=0).sum()
+            caring_dist = gabungan.sort_values(ascending=False).to_dict()
+        else:
+            caring_dist = "-"
+        kosong_count = "-"
+
+    return Ringkasan(
+        total_data=total_data,
+        jumlah_datel=int(per_datel.index.notna().sum()),
+        paid_rate=paid_rate,
+        top_caring=modus(sel, "STATUS CARING 1") if "STATUS CARING 1" in sel.columns else "-",
+        per_datel=valid,
+        total_valid=int(valid["JUMLAH"].sum()),
+        jumlah_datel_valid=len(valid),
+        paid_dist=paid_dist,
+        caring_dist=caring_dist,
+        unpaid_rank=unpaid_rank,
+        kosong_count=kosong_count,
+    )
+
+
+# =========================
+# PERBANDINGAN ANTAR SHEET
+# =========================
+def bandingkan_sheet(kubus_per_sheet, kolom):
+    # Paid rate, jumlah kosong dan campuran kategori caring per DATEL untuk tiap sheet/periode
+    per_datel, campuran = [], []
+    for sheet_name, kubus in kubus_per_sheet.items():
+        cube = kubus.cube
+        if kolom not in cube.columns:
+            continue
+        ringkasan = hitung_ringkasan(cube, kolom)
+        tabel = ringkasan.per_datel
+        paid_rate = (tabel["PAID"] / tabel["JUMLAH"] * 100).round(1) if "PAID" in tabel.columns else float("nan")
+        per_datel.append(pd.DataFrame({
+            "SHEET": sheet_name,
+            "DATEL": tabel.index.astype(str),
+            "JUMLAH": tabel["JUMLAH"].to_numpy(),
+            "PAID RATE": paid_rate,
+            "JUMLAH KOSONG": tabel[nama_kosong(kolom)].to_numpy(),
+        }).reset_index(drop=True))
+
+        valid = cube[datel_valid(cube["DATEL"])]
+        mix = jumlah_per(valid, ["DATEL", nama_kolom_kategori(kolom)]).reset_index()
+        mix.columns = ["DATEL", "KATEGORI CARING", "JUMLAH"]
+        mix["DATEL"] = mix["DATEL"].astype(str)
+        mix.insert(0, "SHEET", sheet_name)
+        campuran.append(mix)
+
+    if not per_datel:
+        return pd.DataFrame(columns=["SHEET", "DATEL", "JUMLAH", "PAID RATE", "JUMLAH KOSONG"]), \
+            pd.DataFrame(columns=["SHEET", "DATEL", "KATEGORI CARING", "JUMLAH"])
+    return pd.concat(per_datel, ignore_index=True), pd.concat(campuran, ignore_index=True)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+
+# =========================
+# DAFTAR STATUS & KATEGORI
+# =========================
+valid_statuses = [
+    "RNA", "TIDAK ADA NO KONTAK", "TIDAK AKTIF", "SALAH SAMBUNG", "REJECTED",
+    "COMPLAINT LAYANAN", "INGIN CABUT", "SUDAH BERHENTI BERLANGGANAN",
+    "RESPONS OK", "LUNAS/PAID"
+]
+
+kategori_dict = {
+    "UNCONTACTABLE": ["RNA", "TIDAK ADA NO KONTAK", "TIDAK AKTIF", "SALAH SAMBUNG", "REJECTED"],
+    "ISSUED": ["COMPLAINT LAYANAN", "INGIN CABUT"],
+    "NOT YET": ["SUDAH BERHENTI BERLANGGANAN", "", "NAN", "NONE", "NULL", "-", "0"],
+    "JANJI BAYAR": ["RESPONS OK"],
+    "PAID": ["LUNAS", "PAID", "LUNAS/PAID"],
+    "ZERO BILLING": ["ZERO BILLING"]
+}
+
+SKOR_MINIMAL = 70
+
+# Indeks balik keyword -> kategori (kategori pertama yang memuat keyword menang)
+keyword_kategori = {}
+for _kat, _values in kategori_dict.items():
+    for _val in _values:
+        keyword_kategori.setdefault(_val, _kat)
+all_keywords = list(keyword_kategori)
+
+_set_status = set(valid_statuses)
+
+# Memo hasil yang sudah pernah dicocokkan, bertahan antar rerun selama proses hidup
+MEMO_MAKS = 100_000
+_memo_status = {}
+_memo_kategori = {}
+
+
+# =========================
+# PENCOCOKAN BATCH
+# =========================
+def _selesaikan(nilai_unik, pilihan, exact, memo, hasil_cocok, hasil_gagal):
+    if len(memo) > MEMO_MAKS:
+        memo.clear()
+
+    sisa = []
+    for nilai in nilai_unik:
+        if nilai in memo:
+            continue
+        if nilai in exact:
+            memo[nilai] = hasil_cocok(nilai)
+        else:
+            sisa.append(nilai)
+    if not sisa:
+        return
+
+    # Satu panggilan cdist untuk semua nilai unik yang belum dikenal
+    skor = process.cdist(sisa, pilihan, scorer=fuzz.WRatio, score_cutoff=SKOR_MINIMAL, workers=-1)
+    terbaik = skor.argmax(axis=1)
+    for nilai, idx, baris in zip(sisa, terbaik, skor):
+        if baris[idx] >= SKOR_MINIMAL:
+            memo[nilai] = hasil_cocok(pilihan[idx])
+        else:
+            memo[nilai] = hasil_gagal(nilai)
+
+
+def _resolve_status(nilai_unik):
+    _selesaikan(nilai_unik, valid_statuses, _set_status, _memo_status,
+                lambda cocok: cocok, lambda asli: asli)
+
+
+def _resolve_kategori(nilai_unik):
+    _selesaikan(nilai_unik, all_keywords, keyword_kategori, _memo_kategori,
+                lambda cocok: keyword_kategori[cocok], lambda asli: "LAINNYA")
+
+
+def _petakan(series, resolve, memo, isi_na):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Categorical: cukup kamus kategorinya yang dipetakan, baris diambil lewat kode (-1 = kosong).
+        # Hasil dibangun sebagai object; map langsung di Categorical bisa menghasilkan Categorical
+        # yang menolak fillna dengan nilai baru
+        kunci = [str(u).strip().upper() for u in series.cat.categories]
+        resolve(set(kunci) | {isi_na})
+        tabel = np.array([memo[k] for k in kunci] + [memo[isi_na]], dtype=object)
+        return pd.Series(tabel[series.cat.codes.to_numpy()], index=series.index, name=series.name)
+
+    # Hanya nilai unik yang diproses, lalu dipetakan balik ke seluruh baris sekaligus
+    kunci = {u: str(u).strip().upper() for u in series.dropna().unique()}
+    resolve(set(kunci.values()) | {isi_na})
+    hasil = series.map({u: memo[k] for u, k in kunci.items()})
+    if series.isna().any():
+        hasil = hasil.fillna(memo[isi_na])
+    return hasil.astype(object)
+
+
+# =========================
+# API
+# =========================
+def normalisasi_kolom(series):
+    # Nilai kosong diperlakukan sebagai string kosong (sama seperti fillna("") sebelumnya)
+    return _petakan(series, _resolve_status, _memo_status, "")
+
+
+def kategori_kolom(series):
+    # Nilai kosong diperlakukan seperti str(nan) -> "NAN"
+    return _petakan(series, _resolve_kategori, _memo_kategori, "NAN")
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+# =========================
+# PROFILING PER TAHAP
+# =========================
+# Pemakaian:
+#   profil = Profiler(aktif)
+#   with profil.tahap("muat_sheet") as t:
+#       df = muat_sheet(...)
+#       t.baris_keluar = len(df)
+#   profil.selesai()   # tulis log JSON ringkasan rerun
+# Kalau tidak aktif, tahap() mengembalikan objek kosong yang sama, tanpa timer maupun tracemalloc.
+# Rerun fragment Streamlit tidak menjalankan ulang skrip: untuk_fragment() memberi Profiler baru
+# (id rerun sendiri) kalau profil full run terakhir sudah selesai().
+
+NAMA_LOGGER = "caring.profil"
+
+# tracemalloc global per proses: dinyalakan saat ada rerun yang diprofil, dimatikan lagi
+# pada rerun pertama tanpa profiling supaya mode normal tidak menanggung biaya tracing
+_tracemalloc_milik_kita = False
+
+
+def aktif_dari_env():
+    return os.environ.get("CARING_PROFIL", "").lower() in ("1", "true", "ya", "yes")
+
+
+def _logger():
+    logger = logging.getLogger(NAMA_LOGGER)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def _atur_tracemalloc(aktif):
+    global _tracemalloc_milik_kita
+    if aktif and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracemalloc_milik_kita = True
+    elif not aktif and _tracemalloc_milik_kita:
+        tracemalloc.stop()
+        _tracemalloc_milik_kita = False
+
+
+class _TahapMati:
+    # Dipakai saat profiling mati: atribut boleh diisi tapi tidak dicatat ke mana pun
+    baris_masuk = None
+    baris_keluar = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_TAHAP_MATI = _TahapMati()
+
+
+class _Tahap:
+    def __init__(self, profil, nama, baris_masuk):
+        self.profil = profil
+        self.nama = nama
+        self.baris_masuk = baris_masuk
+        self.baris_keluar = None
+        self._puncak = 0
+
+    def __enter__(self):
+        # Puncak memori tahap luar diamankan dulu sebelum di-reset untuk tahap ini
+        self._awal_mem, puncak = tracemalloc.get_traced_memory()
+        for induk in self.profil._tumpukan:
+            induk._puncak = max(induk._puncak, puncak)
+        tracemalloc.reset_peak()
+        self.profil._tumpukan.append(self)
+        self._mulai = time.perf_counter()
+        return self
+
+    def __exit__(self, jenis_error, *exc):
+        detik = time.perf_counter() - self._mulai
+        akhir_mem, puncak = tracemalloc.get_traced_memory()
+        self._puncak = max(self._puncak, puncak)
+        self.profil._tumpukan.pop()
+        if self.profil._tumpukan:
+            induk = self.profil._tumpukan[-1]
+            induk._puncak = max(induk._puncak, self._puncak)
+
+        self.profil._catat({
+            "tahap": self.nama,
+            "detik": round(detik, 6),
+            "baris_masuk": self.baris_masuk,
+            "baris_keluar": self.baris_keluar,
+            "memori_puncak_kb": round(max(self._puncak - self._awal_mem, 0) / 1024, 1),
+            "memori_alokasi_kb": round((akhir_mem - self._awal_mem) / 1024, 1),
+            "error": jenis_error.__name__ if jenis_error else None,
+        })
+        return False
+
+
+class Profiler:
+    def __init__(self, aktif=False, fragment=None):
+        self.aktif = aktif
+        self.fragment = fragment
+        self.rerun = uuid.uuid4().hex[:8]
+        self.ditutup = False
+        self.catatan = []
+        self._tumpukan = []
+        self._mulai = time.perf_counter()
+        _atur_tracemalloc(aktif)
+
+    def tahap(self, nama, baris_masuk=None):
+        if not self.aktif:
+            return _TAHAP_MATI
+        return _Tahap(self, nama, baris_masuk)
+
+    def untuk_fragment(self, nama):
+        # Selama full run tahap fragment tetap masuk ke profil ini
+        if not self.ditutup:
+            return self
+        return Profiler(self.aktif, fragment=nama)
+
+    def _info(self):
+        return {"rerun": self.rerun, "fragment": self.fragment} if self.fragment else {"rerun": self.rerun}
+
+    def _catat(self, data):
+        data = {**self._info(), **data}
+        self.catatan.append(data)
+        _logger().info(json.dumps(data, ensure_ascii=False))
+
+    def total_detik(self):
+        return time.perf_counter() - self._mulai
+
+    def selesai(self):
+        # Satu baris log ringkasan per rerun
+        self.ditutup = True
+        if not self.aktif:
+            return
+        _logger().info(json.dumps({
+            **self._info(),
+            "tahap": "TOTAL",
+            "detik": round(self.total_detik(), 6),
+            "jumlah_tahap": len(self.catatan),
+        }))
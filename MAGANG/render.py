@@ -0,0 +1,76 @@
+import hashlib
+import math
+
+import pandas as pd
+import streamlit as st
+
+from cache_lru import CacheLRU
+from core import chart_kosong, chart_pie
+
+# =========================
+# KONFIGURASI RENDER
+# =========================
+FIGURE_MAKS = 64
+BARIS_PER_HALAMAN = 50
+
+_cache_figure = CacheLRU(maks=FIGURE_MAKS)   # (jenis, parameter, hash data) -> figure plotly
+
+
+# =========================
+# CACHE FIGURE
+# =========================
+def hash_data(data):
+    # Hash isi agregat (nilai, index, nama kolom), bukan identitas objek: hasil query yang sama = kunci sama
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    kolom = data.columns if isinstance(data, pd.DataFrame) else [data.name]
+    h.update(repr((list(kolom), list(data.index.names))).encode("utf-8"))
+    return h.hexdigest()
+
+
+def figure_cache(jenis, data, parameter, buat):
+    # Figure dibangun sekali per (jenis, parameter, isi data) dan dipakai bersama antar rerun/sesi.
+    # Figure di cache tidak boleh diubah setelah dikembalikan
+    return _cache_figure.ambil_atau_buat((jenis, parameter, hash_data(data)), buat)
+
+
+def pie(jumlah, kolom, judul):
+    return figure_cache("pie", jumlah, (kolom, judul), lambda: chart_pie(jumlah, kolom, judul))
+
+
+def bar_kosong(tabel, daftar_kolom):
+    return figure_cache("bar_kosong", tabel, tuple(daftar_kolom), lambda: chart_kosong(tabel, daftar_kolom))
+
+
+def px_figure(jenis, data, traces=None, **kwargs):
+    # Figure plotly.express umum (bar, line, ...) + update_traces opsional, ikut di-cache
+    def buat():
+        import plotly.express as px
+
+        fig = getattr(px, jenis)(data, **kwargs)
+        if traces:
+            fig.update_traces(**traces)
+        return fig
+
+    parameter = (repr(sorted(kwargs.items())), repr(sorted((traces or {}).items())))
+    return figure_cache(jenis, data, parameter, buat)
+
+
+# =========================
+# TABEL BERHALAMAN
+# =========================
+def tabel_halaman(df, key, baris_per_halaman=BARIS_PER_HALAMAN, **kwargs):
+    # Hanya potongan halaman aktif yang dikirim ke browser; tabel kecil tampil utuh seperti biasa
+    if len(df) <= baris_per_halaman:
+        st.dataframe(df, **kwargs)
+        return
+
+    jumlah_halaman = math.ceil(len(df) / baris_per_halaman)
+    kiri, kanan = st.columns([1, 3])
+    halaman = kiri.number_input(
+        "Halaman", min_value=1, max_value=jumlah_halaman, value=1, step=1, key=f"{key}_halaman"
+    )
+    mulai = (int(halaman) - 1) * baris_per_halaman
+    akhir = min(mulai + baris_per_halaman, len(df))
+    kanan.caption(f"Baris {mulai + 1}–{akhir} dari {len(df)} ({jumlah_halaman} halaman)")
+    st.dataframe(df.iloc[mulai:akhir], **kwargs)
@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ingest import kolom_kategori, kolom_privasi
+from normalisasi import kategori_kolom
+
+# =========================
+# KONFIGURASI RIWAYAT
+# =========================
+# Sheet yang di-upload (tanpa kolom privasi) disimpan per periode (label, default nama sheet) di SQLite,
+# supaya tren antar minggu/bulan bisa dihitung tanpa upload ulang file lama
+RIWAYAT_DB = os.environ.get(
+    "CARING_RIWAYAT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".riwayat_caring.sqlite")
+)
+UKURAN_BATCH = 50_000
+
+# Kolom kategori disimpan sebagai kolom tabel, sisanya sebagai JSON per baris
+kolom_db = {kolom: kolom.lower().replace(" ", "_") for kolom in kolom_kategori}
+
+_kunci_lock = threading.Lock()
+_sudah_sinkron = set()   # (file_hash, periode, path db) yang sudah disimpan di proses ini
+
+SKEMA = f"""
+CREATE TABLE IF NOT EXISTS periode (
+    id INTEGER PRIMARY KEY,
+    nama TEXT UNIQUE NOT NULL,
+    kolom TEXT NOT NULL,
+    jumlah_baris INTEGER NOT NULL,
+    dibuat TEXT NOT NULL,
+    diperbarui TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sumber (
+    file_hash TEXT NOT NULL,
+    periode_id INTEGER NOT NULL,
+    PRIMARY KEY (file_hash, periode_id)
+);
+CREATE TABLE IF NOT EXISTS baris (
+    periode_id INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    {", ".join(f"{nama} TEXT" for nama in kolom_db.values())},
+    data TEXT,
+    PRIMARY KEY (periode_id, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS baris_datel ON baris (periode_id, datel);
+"""
+
+
+def riwayat_aktif():
+    return os.environ.get("CARING_RIWAYAT", "1").lower() not in ("0", "false", "tidak", "no")
+
+
+def buka(path=None):
+    path = path or RIWAYAT_DB
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SKEMA)
+    return conn
+
+
+# =========================
+# HASH BARIS
+# =========================
+def hash_baris(df):
+    # Hash isi baris (urutan kolom tidak berpengaruh). Baris kembar diberi nomor kemunculan
+    # supaya tetap tersimpan sebanyak jumlahnya, bukan dilebur jadi satu
+    isi = pd.util.hash_pandas_object(df[sorted(df.columns)], index=False)
+    ke = isi.groupby(isi).cumcount()
+    final = pd.util.hash_pandas_object(pd.DataFrame({"h": isi.to_numpy(), "k": ke.to_numpy()}), index=False)
+    return final.to_numpy().view(np.int64)
+
+
+def _teks(series):
+    # Nilai kategori ke teks biasa, NaN/None -> NULL
+    nilai = series.astype(object)
+    return nilai.where(nilai.notna(), None).tolist()
+
+
+def _baris_db(periode_id, potongan, hash_potongan, kolom_data):
+    kolom = [_teks(potongan[k]) if k in potongan.columns else [None] * len(potongan) for k in kolom_db]
+    if kolom_data:
+        data = potongan[kolom_data].to_json(orient="records", lines=True, date_format="iso",
+                                            force_ascii=False).splitlines()
+    else:
+        data = [None] * len(potongan)
+    return zip([periode_id] * len(potongan), hash_potongan.tolist(), *kolom, data)
+
+
+# =========================
+# SIMPAN (INKREMENTAL)
+# =========================
+def status_periode(periode, file_hash=None, path=None):
+    # "baru" (label belum dipakai), "sama" (isi periode berasal dari file ini),
+    # atau "lain" (periode sudah berisi file lain: menyimpan berarti menimpa)
+    if file_hash and (file_hash, periode, path or RIWAYAT_DB) in _sudah_sinkron:
+        return "sama"
+    with closing(buka(path)) as conn:
+        baris = conn.execute("SELECT id FROM periode WHERE nama = ?", (periode,)).fetchone()
+        if baris is None:
+            return "baru"
+        if file_hash and conn.execute(
+            "SELECT 1 FROM sumber WHERE file_hash = ? AND periode_id = ?", (file_hash, baris[0])
+        ).fetchone():
+            return "sama"
+    return "lain"
+
+
+def simpan_sheet(periode, df, file_hash=None, path=None, timpa=False):
+    # Sinkronkan isi periode dengan df: baris baru/berubah ditambah, baris yang hilang dihapus.
+    # Periode yang sudah berisi file lain hanya disinkronkan kalau timpa=True (ValueError kalau tidak).
+    # Hasil: {"tambah": n, "hapus": n, "tetap": n}, atau None kalau file yang sama sudah pernah disimpan
+    kunci = (file_hash, periode, path or RIWAYAT_DB)
+    if file_hash and kunci in _sudah_sinkron:
+        return None
+
+    df = df.drop(columns=[k for k in kolom_privasi if k in df.columns])
+    with _kunci_lock, closing(buka(path)) as conn:
+        baris = conn.execute("SELECT id FROM periode WHERE nama = ?", (periode,)).fetchone()
+        periode_id = baris[0] if baris else None
+        if file_hash and periode_id is not None and conn.execute(
+            "SELECT 1 FROM sumber WHERE file_hash = ? AND periode_id = ?", (file_hash, periode_id)
+        ).fetchone():
+            _sudah_sinkron.add(kunci)
+            return None
+        if periode_id is not None and not timpa:
+            raise ValueError(f"Periode '{periode}' sudah berisi data dari file lain")
+
+        hash_df = hash_baris(df)
+        sekarang = datetime.now().isoformat(timespec="seconds")
+        with conn:
+            if periode_id is None:
+                periode_id = conn.execute(
+                    "INSERT INTO periode (nama, kolom, jumlah_baris, dibuat, diperbarui) VALUES (?, ?, 0, ?, ?)",
+                    (periode, "[]", sekarang, sekarang),
+                ).lastrowid
+                lama = np.empty(0, dtype=np.int64)
+            else:
+                lama = np.fromiter(
+                    (h for (h,) in conn.execute("SELECT hash FROM baris WHERE periode_id = ?", (periode_id,))),
+                    dtype=np.int64,
+                )
+
+            hapus = np.setdiff1d(lama, hash_df, assume_unique=True)
+            if len(hapus):
+                conn.executemany(
+                    "DELETE FROM baris WHERE periode_id = ? AND hash = ?",
+                    ((periode_id, int(h)) for h in hapus),
+                )
+
+            baru = ~np.isin(hash_df, lama, assume_unique=True)
+            posisi = np.flatnonzero(baru)
+            kolom_data = [k for k in df.columns if k not in kolom_db]
+            isi_kolom = ", ".join(["periode_id", "hash"] + list(kolom_db.values()) + ["data"])
+            tanda = ", ".join("?" * (len(kolom_db) + 3))
+            for mulai in range(0, len(posisi), UKURAN_BATCH):
+                idx = posisi[mulai:mulai + UKURAN_BATCH]
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO baris ({isi_kolom}) VALUES ({tanda})",
+                    _baris_db(periode_id, df.iloc[idx], hash_df[idx], kolom_data),
+                )
+
+            conn.execute(
+                "UPDATE periode SET kolom = ?, jumlah_baris = ?, diperbarui = ? WHERE id = ?",
+                (json.dumps(list(df.columns), ensure_ascii=False), len(df), sekarang, periode_id),
+            )
+            # Periode kini mencerminkan file ini saja; file lama yang di-upload ulang disinkronkan lagi
+            conn.execute("DELETE FROM sumber WHERE periode_id = ?", (periode_id,))
+            if file_hash:
+                conn.execute("INSERT INTO sumber VALUES (?, ?)", (file_hash, periode_id))
+
+        _sudah_sinkron.difference_update({k for k in _sudah_sinkron if k[1:] == kunci[1:]})
+        if file_hash:
+            _sudah_sinkron.add(kunci)
+    return {"tambah": int(baru.sum()), "hapus": int(len(hapus)), "tetap": int(len(hash_df) - baru.sum())}
+
+
+# =========================
+# QUERY TREN
+# =========================
+def daftar_periode(path=None):
+    # Urut sesuai waktu periode pertama kali disimpan
+    with closing(buka(path)) as conn:
+        return pd.read_sql_query(
+            "SELECT nama AS PERIODE, jumlah_baris AS JUMLAH, diperbarui AS DIPERBARUI, kolom FROM periode ORDER BY id",
+            conn,
+        )
+
+
+def tren_paid_rate(path=None):
+    # PERIODE, DATEL, JUMLAH, PAID, PAID RATE (DATEL kosong diabaikan seperti perbandingan sheet)
+    with closing(buka(path)) as conn:
+        tren = pd.read_sql_query(
+            """
+            SELECT p.nama AS PERIODE, b.datel AS DATEL, COUNT(*) AS JUMLAH,
+                   SUM(b.status_paid = 'PAID') AS PAID
+            FROM baris b JOIN periode p ON p.id = b.periode_id
+            WHERE b.datel IS NOT NULL AND b.datel != ''
+            GROUP BY p.id, b.datel
+            ORDER BY p.id, b.datel
+            """,
+            conn,
+        )
+    tren["PAID RATE"] = (tren["PAID"] / tren["JUMLAH"] * 100).round(1)
+    return tren
+
+
+def tren_kategori(kolom, path=None):
+    # PERIODE, DATEL, KATEGORI CARING, JUMLAH untuk periode yang punya kolom caring tersebut
+    nama_kolom = kolom_db[kolom]
+    periode = daftar_periode(path)
+    punya = periode.loc[periode["kolom"].map(lambda k: kolom in json.loads(k)), "PERIODE"].tolist()
+    if not punya:
+        return pd.DataFrame(columns=["PERIODE", "DATEL", "KATEGORI CARING", "JUMLAH"])
+
+    with closing(buka(path)) as conn:
+        jumlah = pd.read_sql_query(
+            f"""
+            SELECT p.nama AS PERIODE, b.datel AS DATEL, b.{nama_kolom} AS STATUS, COUNT(*) AS JUMLAH
+            FROM baris b JOIN periode p ON p.id = b.periode_id
+            WHERE b.datel IS NOT NULL AND b.datel != ''
+              AND p.nama IN ({", ".join("?" * len(punya))})
+            GROUP BY p.id, b.datel, b.{nama_kolom}
+            ORDER BY p.id
+            """,
+            conn,
+            params=punya,
+        )
+    jumlah["KATEGORI CARING"] = kategori_kolom(jumlah["STATUS"])
+    tren = jumlah.groupby(["PERIODE", "DATEL", "KATEGORI CARING"], sort=False)["JUMLAH"].sum().reset_index()
+    return tren